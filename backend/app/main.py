@@ -1,15 +1,28 @@
 """FastAPI application entry point."""
 from fastapi import FastAPI
-from .routers import schedules, members, availabilities, shift_generation
+from .db import dispose_async_engine
+from .routers import schedules, members, availabilities, shift_generation, metrics as metrics_router
+from .services import jobs, metrics
 
 app = FastAPI()
+app.add_middleware(metrics.ServerTimingMiddleware)
 app.include_router(schedules.router)
 app.include_router(members.router)
 app.include_router(availabilities.router)
 app.include_router(shift_generation.router)
+app.include_router(metrics_router.router)
 
 
 @app.get("/")
 def read_root():
     return {"message": "Shift maker API"}
 
+
+@app.on_event("shutdown")
+def shutdown_job_pool() -> None:
+    jobs.job_manager.shutdown()
+
+
+@app.on_event("shutdown")
+async def close_async_engine() -> None:
+    await dispose_async_engine()
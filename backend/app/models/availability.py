@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Date, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, Date, ForeignKey, DateTime, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..db import Base
@@ -6,10 +6,16 @@ from ..db import Base
 
 class Availability(Base):
     __tablename__ = "availabilities"
+    __table_args__ = (
+        # One row per member and date; also serves lookups by member_id
+        Index("uq_availabilities_member_date", "member_id", "date", unique=True),
+        # Date-range scans during generation
+        Index("ix_availabilities_date", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     member_id = Column(Integer, ForeignKey("members.id"), nullable=False)
     date = Column(Date, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
 
-    member = relationship("Member", back_populates="availabilities")
\ No newline at end of file
+    member = relationship("Member", back_populates="availabilities")
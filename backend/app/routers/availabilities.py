@@ -1,16 +1,19 @@
-from typing import List
-from datetime import date, datetime
-from fastapi import APIRouter, Depends, File, HTTPException, status, UploadFile
-from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+from datetime import date
+import numpy as np
+from anyio import to_thread
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, status, UploadFile
+from sqlalchemy import String, and_, bindparam, cast, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-import csv
-from io import StringIO
 
-from ..db import Base, engine, get_db
+from ..db import get_async_db, init_db, insert_ignoring_duplicates
 from ..models.availability import Availability
 from ..models.member import Member
+from ..services import availability_sheet, columnar, csv_stream, metrics
+from ..services.member_cache import MemberCache, get_member_cache
 
-Base.metadata.create_all(bind=engine)
+init_db()
 
 router = APIRouter(prefix="/availabilities", tags=["availabilities"])
 
@@ -42,16 +45,20 @@ class AvailabilityUploadResponse(BaseModel):
     total_availabilities: int
     error_count: int
     errors: List[str] = []
+    mode: str
+    inserted: int
+    deleted: int
+    unchanged: int
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-def set_member_availability(
+async def set_member_availability(
     availability: AvailabilityCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> dict:
     """Set availability for a member (replaces existing availability)."""
     # Verify member exists
-    member = db.query(Member).filter(Member.id == availability.member_id).first()
+    member = await db.get(Member, availability.member_id)
     if member is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -59,77 +66,310 @@ def set_member_availability(
         )
     
     # Remove existing availability for this member
-    db.query(Availability).filter(Availability.member_id == availability.member_id).delete()
+    await db.execute(delete(Availability).where(Availability.member_id == availability.member_id))
     
     # Add new availability
-    for date_item in availability.dates:
-        db_availability = Availability(
-            member_id=availability.member_id,
-            date=date_item
+    new_dates = set(availability.dates)
+    if new_dates:
+        await db.execute(
+            Availability.__table__.insert(),
+            [{"member_id": availability.member_id, "date": d} for d in new_dates],
         )
-        db.add(db_availability)
     
-    db.commit()
+    await db.commit()
     return {"message": f"Availability set for member {availability.member_id}", "count": len(availability.dates)}
 
 
+async def _member_availabilities(
+    db: AsyncSession,
+    members,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> List[MemberAvailabilityResponse]:
+    """Load the available dates of the members in ``members`` with one query.
+
+    ``members`` is a subquery with ``id`` and ``name`` columns. Members
+    without availability in the date range are returned with no dates.
+    """
+    conditions = [Availability.member_id == members.c.id]
+    if start is not None:
+        conditions.append(Availability.date >= start)
+    if end is not None:
+        conditions.append(Availability.date <= end)
+    
+    rows = await db.execute(
+        select(members.c.id, members.c.name, Availability.date)
+        .outerjoin(Availability, and_(*conditions))
+        .order_by(members.c.id, Availability.date)
+    )
+    
+    result = []
+    for member_id, member_name, availability_date in rows:
+        if not result or result[-1].member_id != member_id:
+            result.append(MemberAvailabilityResponse(
+                member_id=member_id,
+                member_name=member_name,
+                dates=[]
+            ))
+        if availability_date is not None:
+            result[-1].dates.append(availability_date)
+    return result
+
+
 @router.get("/member/{member_id}", response_model=MemberAvailabilityResponse)
-def get_member_availability(
+async def get_member_availability(
     member_id: int,
-    db: Session = Depends(get_db),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db),
 ) -> MemberAvailabilityResponse:
-    """Get availability for a specific member."""
-    member = db.query(Member).filter(Member.id == member_id).first()
-    if member is None:
+    """Get availability for a specific member, optionally within a date range."""
+    member = select(Member.id, Member.name).where(Member.id == member_id).subquery()
+    result = await _member_availabilities(db, member, start, end)
+    if not result:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Member with id {member_id} not found"
         )
     
-    availabilities = db.query(Availability).filter(Availability.member_id == member_id).all()
-    dates = [availability.date for availability in availabilities]
-    
-    return MemberAvailabilityResponse(
-        member_id=member_id,
-        member_name=member.name,
-        dates=sorted(dates)
-    )
+    return result[0]
 
 
 @router.get("/", response_model=List[MemberAvailabilityResponse])
-def list_all_availabilities(db: Session = Depends(get_db)) -> List[MemberAvailabilityResponse]:
-    """List availability for all members."""
-    members = db.query(Member).all()
-    result = []
-    
-    for member in members:
-        availabilities = db.query(Availability).filter(Availability.member_id == member.id).all()
-        dates = [availability.date for availability in availabilities]
-        
-        result.append(MemberAvailabilityResponse(
-            member_id=member.id,
-            member_name=member.name,
-            dates=sorted(dates)
-        ))
+async def list_all_availabilities(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_async_db),
+) -> List[MemberAvailabilityResponse]:
+    """List availability for all members.
+
+    Members are ordered by id; ``skip`` and ``limit`` page through them and
+    ``start``/``end`` restrict the returned dates.
+    """
+    members = select(Member.id, Member.name).order_by(Member.id).offset(skip)
+    if limit is not None:
+        members = members.limit(limit)
     
-    return result
+    return await _member_availabilities(db, members.subquery(), start, end)
 
 
 @router.delete("/member/{member_id}", status_code=status.HTTP_204_NO_CONTENT)
-def clear_member_availability(
+async def clear_member_availability(
     member_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> None:
     """Clear all availability for a specific member."""
-    member = db.query(Member).filter(Member.id == member_id).first()
+    member = await db.get(Member, member_id)
     if member is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Member with id {member_id} not found"
         )
     
-    db.query(Availability).filter(Availability.member_id == member_id).delete()
-    db.commit()
+    await db.execute(delete(Availability).where(Availability.member_id == member_id))
+    await db.commit()
+
+
+def _availability_records(
+    member_ids: np.ndarray,
+    dates: np.ndarray,
+    available: np.ndarray,
+) -> List[dict]:
+    """Build insert rows from a members x dates availability matrix.
+
+    Members with a negative id are skipped. Rows are ordered by member and
+    date, which matches the unique index and keeps its inserts sequential.
+    """
+    member_rows, date_columns = np.nonzero(available & (member_ids >= 0)[:, None])
+    date_objects = np.asarray(dates, dtype="datetime64[D]").astype(object)
+    return [
+        {"member_id": member_id, "date": day}
+        for member_id, day in zip(member_ids[member_rows].tolist(), date_objects[date_columns].tolist())
+    ]
+
+
+async def _merge_availability(
+    db: AsyncSession,
+    member_ids: np.ndarray,
+    dates: np.ndarray,
+    available: np.ndarray,
+    invalid: np.ndarray,
+) -> Tuple[int, int, int]:
+    """Apply only the differences between ``available`` and the stored rows.
+
+    Stored availability of the uploaded members is replaced between the
+    first and last uploaded date; other members and dates are left alone,
+    and so are the cells marked in ``invalid``. Returns the number of
+    inserted, deleted and unchanged rows.
+    """
+    known = member_ids[member_ids >= 0].tolist()
+    if not known or not len(dates):
+        return 0, 0, 0
+    # Dates are fetched as ISO text and converted in bulk, which is much
+    # faster than building a ``date`` object per stored row
+    with metrics.stage("load_existing"):
+        result = await db.execute(
+            select(Availability.member_id, cast(Availability.date, String)).where(
+                Availability.member_id.in_(known),
+                Availability.date >= dates[0].item(),
+                Availability.date <= dates[-1].item(),
+            )
+        )
+        rows = result.all()
+    
+    def build():
+        days, inserts, deletes = availability_sheet.diff(
+            member_ids,
+            dates,
+            available,
+            np.array([member_id for member_id, _ in rows], dtype=np.int64),
+            np.array([d for _, d in rows], dtype="datetime64[D]"),
+            invalid,
+        )
+        return (
+            _availability_records(member_ids, days, inserts),
+            _availability_records(member_ids, days, deletes),
+        )
+    
+    with metrics.stage("diff"):
+        insert_records, delete_records = await to_thread.run_sync(build)
+    
+    table = Availability.__table__
+    delete_availability = table.delete().where(
+        table.c.member_id == bindparam("member_id"), table.c.date == bindparam("date")
+    )
+    for batch in csv_stream.batched(delete_records):
+        with metrics.stage("delete"):
+            await db.execute(delete_availability, batch)
+    insert_availability = insert_ignoring_duplicates(table)
+    for batch in csv_stream.batched(insert_records):
+        with metrics.stage("insert"):
+            await db.execute(insert_availability, batch)
+    unchanged = len(rows) - len(delete_records)
+    return len(insert_records), len(delete_records), unchanged
+
+
+def _sheet_errors(sheet: availability_sheet.Sheet, member_name_to_id: Dict[str, int]) -> List[str]:
+    """Describe the invalid dates and cells of ``sheet`` in row order.
+
+    Cells of unknown members and of rows with an invalid date are not
+    reported.
+    """
+    valid = sheet.valid_rows
+    errors = [
+        (row, -1, f"Row {sheet.row_numbers[row]}: Invalid date format '{sheet.date_strings[row]}'. Use YYYY/MM/DD or YYYY-MM-DD")
+        for row in np.flatnonzero(~valid).tolist()
+    ]
+    rows, columns = sheet.invalid_cells
+    for row, column, value in zip(rows.tolist(), columns.tolist(), sheet.invalid_values):
+        member_name = sheet.member_names[column]
+        if valid[row] and member_name in member_name_to_id:
+            errors.append((row, column, f"Row {sheet.row_numbers[row]}, Member '{member_name}': Invalid availability '{value}'. Use ○ for available, × for not available"))
+    return [message for _, _, message in sorted(errors)]
+
+
+@router.get(
+    "/export",
+    response_class=Response,
+    responses={200: {"content": {columnar.MEDIA_TYPE: {}}, "description": "Availability matrix file"}},
+)
+async def export_availabilities(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db),
+) -> Response:
+    """Export all members' availability as a bit-packed member x date matrix.
+
+    The file is read with ``services.columnar.load``; dates without any
+    availability are left out.
+    """
+    members = (await db.execute(select(Member.id, Member.name).order_by(Member.id))).all()
+    query = select(Availability.member_id, Availability.date)
+    if start is not None:
+        query = query.where(Availability.date >= start)
+    if end is not None:
+        query = query.where(Availability.date <= end)
+    rows = (await db.execute(query)).all()
+    
+    member_ids = np.array([member_id for member_id, _ in members], dtype=np.int64)
+    row_members = np.array([member_id for member_id, _ in rows], dtype=np.int64)
+    row_dates = np.array([d for _, d in rows], dtype="datetime64[D]")
+    dates, date_positions = np.unique(row_dates, return_inverse=True)
+    matrix = np.zeros((len(member_ids), len(dates)), dtype=bool)
+    matrix[np.searchsorted(member_ids, row_members), date_positions] = True
+    
+    table = columnar.pack(
+        "availability", member_ids, [name for _, name in members], dates, matrix
+    )
+    return Response(
+        content=columnar.dumps(table),
+        media_type=columnar.MEDIA_TYPE,
+        headers={"Content-Disposition": 'attachment; filename="availability.npz"'},
+    )
+
+
+@router.post(
+    "/import",
+    status_code=status.HTTP_201_CREATED,
+    response_model=AvailabilityUploadResponse,
+)
+async def import_availabilities(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db),
+    cache: MemberCache = Depends(get_member_cache),
+) -> AvailabilityUploadResponse:
+    """Replace all availability with a matrix file from ``/availabilities/export``.
+
+    Members are matched by name, so files can move between databases. The
+    upload is spooled to a temporary file and memory-mapped.
+    """
+    try:
+        table = await to_thread.run_sync(columnar.load_upload, file.file)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to read matrix file: {e}"
+        )
+    if table.kind != "availability":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Expected an availability matrix, got '{table.kind}'"
+        )
+    
+    names = table.member_names.tolist()
+    with metrics.stage("member_lookup"):
+        member_name_to_id = await cache.ids(db, names)
+    errors = [f"Member '{name}' not found in database" for name in names if name not in member_name_to_id]
+    
+    ids = np.array([member_name_to_id.get(name, -1) for name in names], dtype=np.int64)
+    dates = table.dates
+    records = await to_thread.run_sync(_availability_records, ids, dates, table.matrix)
+    
+    with metrics.stage("clear"):
+        deleted = (await db.execute(delete(Availability))).rowcount
+    insert_availability = insert_ignoring_duplicates(Availability.__table__)
+    for batch in csv_stream.batched(records):
+        with metrics.stage("insert"):
+            await db.execute(insert_availability, batch)
+    with metrics.stage("commit"):
+        await db.commit()
+    metrics.inc("shift_upload_rows_total", len(records), kind="availabilities")
+    metrics.inc("shift_upload_errors_total", len(errors), kind="availabilities")
+    
+    return AvailabilityUploadResponse(
+        message=f"Matrix imported. Processed {len(dates)} dates for {len(member_name_to_id)} members with {len(records)} availability records. Errors: {len(errors)}",
+        processed_dates=len(dates),
+        processed_members=len(member_name_to_id),
+        total_availabilities=len(records),
+        error_count=len(errors),
+        errors=errors,
+        mode="replace",
+        inserted=len(records),
+        deleted=deleted,
+        unchanged=0,
+    )
 
 
 @router.post(
@@ -137,9 +377,18 @@ def clear_member_availability(
     status_code=status.HTTP_201_CREATED,
     response_model=AvailabilityUploadResponse,
 )
-def upload_availabilities_csv(
+async def upload_availabilities_csv(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    mode: str = Query(
+        "replace",
+        pattern="^(replace|merge)$",
+        description=(
+            "replace: clear all availability first, "
+            "merge: only add and remove the rows that differ within the sheet's date range"
+        ),
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    cache: MemberCache = Depends(get_member_cache),
 ) -> AvailabilityUploadResponse:
     """Upload availability data from CSV file.
     
@@ -152,6 +401,16 @@ def upload_availabilities_csv(
     Where:
     - First column is empty in header, followed by member names
     - Data rows start with date, followed by availability (○ = available, × = not available)
+
+    The sheet is parsed in a worker thread by ``services.availability_sheet``.
+    Rows repeating a date are merged.
+
+    In ``merge`` mode the availability of the sheet's members is compared
+    with the stored rows from the first to the last date of the sheet, and
+    only the differing rows are inserted or deleted; dates in that range
+    missing from the sheet count as unavailable. Other members and dates
+    are kept, as is the stored value of every invalid cell. The response
+    reports the inserted, deleted and unchanged rows.
     """
     if not file.filename.endswith('.csv'):
         raise HTTPException(
@@ -160,112 +419,80 @@ def upload_availabilities_csv(
         )
     
     try:
-        content = file.file.read().decode('utf-8')
-        csv_reader = csv.reader(StringIO(content))
-        
-        processed_dates = 0
-        processed_members = 0
-        total_availabilities = 0
-        error_count = 0
-        errors = []
-        
-        # Read header row to get member names
-        header = next(csv_reader)
-        if len(header) < 2:
+        with metrics.stage("parse"):
+            sheet = await to_thread.run_sync(availability_sheet.parse, file.file)
+        if not sheet.member_names:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="CSV must have at least one member column"
             )
         
-        # Skip first empty column, get member names
-        member_names = [name.strip() for name in header[1:] if name.strip()]
-        
-        # Get member IDs from names
-        member_name_to_id = {}
-        for name in member_names:
-            member = db.query(Member).filter(Member.name == name).first()
-            if member:
-                member_name_to_id[name] = member.id
-            else:
-                errors.append(f"Member '{name}' not found in database")
-                error_count += 1
-        
+        # Get member IDs from names, loading the members at most once
+        with metrics.stage("member_lookup"):
+            member_name_to_id = await cache.ids(db, sheet.member_names)
+        errors = [
+            f"Member '{name}' not found in database"
+            for name in sheet.member_names
+            if name not in member_name_to_id
+        ]
+        errors += _sheet_errors(sheet, member_name_to_id)
         processed_members = len(member_name_to_id)
         
-        # Clear ALL existing availability data before uploading new data
-        db.query(Availability).delete(synchronize_session=False)
-        db.flush()  # Ensure the delete is committed before proceeding
-        
-        # Process data rows
-        for row_num, row in enumerate(csv_reader, start=2):
-            try:
-                if len(row) < 2:
-                    continue
-                    
-                # Parse date from first column
-                date_str = row[0].strip()
-                if not date_str:
-                    continue
-                    
-                try:
-                    # Try different date formats
-                    if '/' in date_str:
-                        parsed_date = datetime.strptime(date_str, '%Y/%m/%d').date()
-                    elif '-' in date_str:
-                        parsed_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                    else:
-                        raise ValueError("Invalid date format")
-                except ValueError:
-                    errors.append(f"Row {row_num}: Invalid date format '{date_str}'. Use YYYY/MM/DD or YYYY-MM-DD")
-                    error_count += 1
-                    continue
-                
-                # Process availability for each member
-                for i, availability_str in enumerate(row[1:]):
-                    if i < len(member_names):
-                        member_name = member_names[i]
-                        if member_name in member_name_to_id:
-                            member_id = member_name_to_id[member_name]
-                            availability_str = availability_str.strip()
-                            
-                            # Check if available (○ means available)
-                            if availability_str in ['○', 'o', 'O', '1', 'true', 'True', 'available']:
-                                # Create availability record
-                                new_availability = Availability(
-                                    member_id=member_id,
-                                    date=parsed_date
-                                )
-                                db.add(new_availability)
-                                total_availabilities += 1
-                            elif availability_str in ['×', 'x', 'X', '0', 'false', 'False', 'not available']:
-                                # Don't create record for unavailable (absence means unavailable)
-                                pass
-                            else:
-                                errors.append(f"Row {row_num}, Member '{member_name}': Invalid availability '{availability_str}'. Use ○ for available, × for not available")
-                                error_count += 1
-                
-                processed_dates += 1
-                
-            except Exception as e:
-                errors.append(f"Row {row_num}: {str(e)}")
-                error_count += 1
-                continue
+        dates, available = sheet.available_by_date()
+        member_ids = np.array(
+            [member_name_to_id.get(name, -1) for name in sheet.member_names], dtype=np.int64
+        )
+        if mode == "merge":
+            _, invalid = sheet.invalid_by_date()
+            inserted, deleted, unchanged = await _merge_availability(
+                db, member_ids, dates, available.T, invalid.T
+            )
+            total_availabilities = inserted + unchanged
+        else:
+            records = await to_thread.run_sync(
+                _availability_records, member_ids, dates, available.T
+            )
+            
+            # Clear ALL existing availability data before uploading new data
+            with metrics.stage("clear"):
+                deleted = (await db.execute(delete(Availability))).rowcount
+            
+            # Availability rows are inserted with one executemany per batch
+            # instead of one ORM object per cell
+            insert_availability = insert_ignoring_duplicates(Availability.__table__)
+            for batch in csv_stream.batched(records):
+                with metrics.stage("insert"):
+                    await db.execute(insert_availability, batch)
+            inserted, unchanged = len(records), 0
+            total_availabilities = len(records)
         
         # Commit all changes
-        db.commit()
+        with metrics.stage("commit"):
+            await db.commit()
+        processed_dates = int(sheet.valid_rows.sum())
+        error_count = len(errors)
+        metrics.inc("shift_upload_rows_total", inserted, kind="availabilities")
+        metrics.inc("shift_upload_errors_total", error_count, kind="availabilities")
         
+        message = f"CSV processed successfully. Processed {processed_dates} dates for {processed_members} members with {total_availabilities} availability records."
+        if mode == "merge":
+            message += f" Inserted {inserted}, deleted {deleted}, unchanged {unchanged}."
         return AvailabilityUploadResponse(
-            message=f"CSV processed successfully. Processed {processed_dates} dates for {processed_members} members with {total_availabilities} availability records. Errors: {error_count}",
+            message=f"{message} Errors: {error_count}",
             processed_dates=processed_dates,
             processed_members=processed_members,
             total_availabilities=total_availabilities,
             error_count=error_count,
-            errors=errors
+            errors=errors,
+            mode=mode,
+            inserted=inserted,
+            deleted=deleted,
+            unchanged=unchanged,
         )
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to process CSV file: {str(e)}"
-        )
\ No newline at end of file
+        )
@@ -1,14 +1,16 @@
-from typing import List
+from typing import Iterator, List, Tuple
+from anyio import to_thread
 from fastapi import APIRouter, Depends, File, HTTPException, status, UploadFile
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-import csv
-from io import StringIO
 
-from ..db import Base, engine, get_db
+from ..db import get_async_db, init_db, upsert
 from ..models.member import Member
+from ..services import csv_stream, metrics
+from ..services.member_cache import MemberCache, MemberInfo, get_member_cache
 
-Base.metadata.create_all(bind=engine)
+init_db()
 
 router = APIRouter(prefix="/members", tags=["members"])
 
@@ -42,9 +44,10 @@ class MemberUploadResponse(BaseModel):
     status_code=status.HTTP_201_CREATED,
     response_model=MemberResponse,
 )
-def create_member(
+async def create_member(
     member: MemberCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    cache: MemberCache = Depends(get_member_cache),
 ) -> MemberResponse:
     """Create a new member."""
     db_member = Member(
@@ -53,75 +56,104 @@ def create_member(
         is_committee=member.is_committee,
     )
     db.add(db_member)
-    db.commit()
-    db.refresh(db_member)
+    await db.commit()
+    await db.refresh(db_member)
+    cache.put(db_member.name, MemberInfo(db_member.id, db_member.gender, db_member.is_committee))
     return db_member
 
 
 @router.get("/", response_model=List[MemberResponse])
-def list_members(db: Session = Depends(get_db)) -> List[Member]:
+async def list_members(db: AsyncSession = Depends(get_async_db)) -> List[Member]:
     """List all members."""
-    return db.query(Member).all()
+    return (await db.scalars(select(Member))).all()
 
 
 @router.delete("/{member_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_member(
+async def delete_member(
     member_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    cache: MemberCache = Depends(get_member_cache),
 ) -> None:
     """Delete a member by ID."""
-    db_member = db.query(Member).filter(Member.id == member_id).first()
+    db_member = await db.get(Member, member_id)
     if db_member is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Member with id {member_id} not found"
         )
     
-    db.delete(db_member)
-    db.commit()
+    await db.delete(db_member)
+    await db.commit()
+    cache.remove(db_member.name)
 
 
-@router.post(
-    "/upload-csv",
-    status_code=status.HTTP_201_CREATED,
-    response_model=MemberUploadResponse,
-)
-def upload_members_csv(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-) -> MemberUploadResponse:
-    """Upload members from CSV file.
-    
-    Expected CSV format:
-    name,gender,is_committee
-    John Doe,M,true
-    Jane Smith,F,false
+async def _write_member_batch(
+    db: AsyncSession, cache: MemberCache, rows: List[dict]
+) -> Tuple[int, int]:
+    """Create or update a batch of validated member rows.
+
+    Existing names come from ``cache``. The batch is written with a single
+    ``INSERT ... ON CONFLICT(name) DO UPDATE`` that returns the ids, which
+    are recorded in ``cache``; databases without it get one executemany
+    each for inserts and updates. Returns the number of created and
+    updated rows; a name repeated in the batch counts as an update.
     """
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="File must be a CSV file"
+    if not rows:
+        return 0, 0
+    
+    members_table = Member.__table__
+    existing = await cache.members(db)
+    # The last row of a repeated name wins
+    latest = {row["name"]: row for row in rows}
+    created_count = sum(1 for name in latest if name not in existing)
+    updated_count = len(rows) - created_count
+    
+    statement = upsert(members_table, "name")
+    if statement is not None:
+        result = await db.execute(
+            statement.returning(members_table.c.name, members_table.c.id),
+            list(latest.values()),
         )
+        for name, member_id in result:
+            row = latest[name]
+            cache.put(name, MemberInfo(member_id, row["gender"], row["is_committee"]))
+        return created_count, updated_count
     
-    try:
-        content = file.file.read().decode('utf-8')
-        csv_reader = csv.DictReader(StringIO(content))
-        
-        created_count = 0
-        updated_count = 0
-        error_count = 0
-        errors = []
-        
-        # Validate required columns
-        required_columns = {'name', 'gender', 'is_committee'}
-        if not required_columns.issubset(set(csv_reader.fieldnames or [])):
-            missing = required_columns - set(csv_reader.fieldnames or [])
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Missing required columns: {', '.join(missing)}"
-            )
-        
-        for row_num, row in enumerate(csv_reader, start=2):  # Start from row 2 (header is row 1)
+    inserts = [row for name, row in latest.items() if name not in existing]
+    updates = [
+        {
+            "member_id": existing[name].id,
+            "new_gender": row["gender"],
+            "new_is_committee": row["is_committee"],
+        }
+        for name, row in latest.items()
+        if name in existing
+    ]
+    if inserts:
+        await db.execute(members_table.insert(), inserts)
+    if updates:
+        await db.execute(
+            members_table.update()
+            .where(members_table.c.id == bindparam("member_id"))
+            .values(
+                gender=bindparam("new_gender"),
+                is_committee=bindparam("new_is_committee"),
+            ),
+            updates,
+        )
+    # The ids of the inserted members are not known
+    cache.invalidate()
+    return created_count, updated_count
+
+
+def _validated_member_batches(csv_reader, errors: List[str]) -> Iterator[List[dict]]:
+    """Yield the valid member rows of each batch of ``csv_reader``.
+
+    Invalid rows are skipped and described in ``errors``.
+    """
+    for batch in csv_stream.batched(enumerate(csv_reader, start=2)):  # Start from row 2 (header is row 1)
+        valid_rows = []
+        for row_num, row in batch:
             try:
                 # Validate and clean data
                 name = row['name'].strip()
@@ -130,12 +162,10 @@ def upload_members_csv(
                 
                 if not name:
                     errors.append(f"Row {row_num}: Name cannot be empty")
-                    error_count += 1
                     continue
                 
                 if gender not in ['M', 'F']:
                     errors.append(f"Row {row_num}: Gender must be 'M' or 'F', got '{gender}'")
-                    error_count += 1
                     continue
                 
                 if is_committee_str in ['true', '1', 'yes', 'y']:
@@ -144,34 +174,73 @@ def upload_members_csv(
                     is_committee = False
                 else:
                     errors.append(f"Row {row_num}: is_committee must be true/false, got '{is_committee_str}'")
-                    error_count += 1
                     continue
                 
-                # Check if member already exists
-                existing_member = db.query(Member).filter(Member.name == name).first()
-                
-                if existing_member:
-                    # Update existing member
-                    existing_member.gender = gender
-                    existing_member.is_committee = is_committee
-                    updated_count += 1
-                else:
-                    # Create new member
-                    new_member = Member(
-                        name=name,
-                        gender=gender,
-                        is_committee=is_committee
-                    )
-                    db.add(new_member)
-                    created_count += 1
+                valid_rows.append(
+                    {"name": name, "gender": gender, "is_committee": is_committee}
+                )
                     
             except Exception as e:
                 errors.append(f"Row {row_num}: {str(e)}")
-                error_count += 1
                 continue
+        yield valid_rows
+
+
+@router.post(
+    "/upload-csv",
+    status_code=status.HTTP_201_CREATED,
+    response_model=MemberUploadResponse,
+)
+async def upload_members_csv(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db),
+    cache: MemberCache = Depends(get_member_cache),
+) -> MemberUploadResponse:
+    """Upload members from CSV file.
+    
+    Expected CSV format:
+    name,gender,is_committee
+    John Doe,M,true
+    Jane Smith,F,false
+
+    The file is read and validated in worker threads, one batch at a time.
+    """
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be a CSV file"
+        )
+    
+    try:
+        created_count = 0
+        updated_count = 0
+        errors = []
+        
+        with csv_stream.open_reader(file.file, dict_rows=True) as csv_reader:
+            # Validate required columns
+            required_columns = {'name', 'gender', 'is_committee'}
+            fieldnames = await to_thread.run_sync(lambda: csv_reader.fieldnames)
+            if not required_columns.issubset(set(fieldnames or [])):
+                missing = required_columns - set(fieldnames or [])
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Missing required columns: {', '.join(missing)}"
+                )
+            
+            # Rows are validated and written one batch at a time
+            batches = _validated_member_batches(csv_reader, errors)
+            async for valid_rows in csv_stream.iterate_in_thread(batches):
+                with metrics.stage("write"):
+                    created, updated = await _write_member_batch(db, cache, valid_rows)
+                created_count += created
+                updated_count += updated
         
         # Commit all changes
-        db.commit()
+        with metrics.stage("commit"):
+            await db.commit()
+        error_count = len(errors)
+        metrics.inc("shift_upload_rows_total", created_count + updated_count, kind="members")
+        metrics.inc("shift_upload_errors_total", error_count, kind="members")
         
         return MemberUploadResponse(
             message=f"CSV processed successfully. Created: {created_count}, Updated: {updated_count}, Errors: {error_count}",
@@ -182,7 +251,8 @@ def upload_members_csv(
         )
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
+        cache.invalidate()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to process CSV file: {str(e)}"
@@ -0,0 +1,20 @@
+"""Router exposing the collected metrics."""
+from __future__ import annotations
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..services import metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics() -> PlainTextResponse:
+    """Return the collected metrics in the Prometheus text format.
+
+    The body is empty unless metrics are enabled with ``SHIFT_METRICS=1``.
+    """
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,13 +1,32 @@
 """Router for schedule-related endpoints."""
 from __future__ import annotations
 
-from fastapi import APIRouter
-from pathlib import Path
 import json
 
+from fastapi import APIRouter, File, HTTPException, Request, Response, UploadFile, status
+from typing import List, Optional
+
+from ..services import columnar, schedule_store
+
 router = APIRouter(prefix="/schedules", tags=["schedules"])
 
-DATA_FILE = Path(__file__).resolve().parents[2] / "data" / "latest_schedule.json"
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Return True if an ``If-None-Match`` header value matches ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _json_response(request: Request, body: bytes, etag: str) -> Response:
+    """Return ``body`` as JSON, or 304 if the client already has it."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 def load_latest_schedule() -> dict:
@@ -19,14 +38,11 @@ def load_latest_schedule() -> dict:
         Parsed JSON data. If the data file does not exist, an empty
         dictionary is returned.
     """
-    if DATA_FILE.exists():
-        with DATA_FILE.open("r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+    return schedule_store.load_latest_schedule()
 
 
 @router.get("/latest")
-def get_latest_schedule() -> dict:
+def get_latest_schedule(request: Request) -> Response:
     """Return the latest shift result.
 
     The returned JSON includes:
@@ -35,5 +51,73 @@ def get_latest_schedule() -> dict:
         * number of committee members
         * gender statistics
         * unapplied rules
+
+    Responses carry an ETag; a matching ``If-None-Match`` gets 304.
+    """
+    body, etag = schedule_store.latest_schedule_payload()
+    return _json_response(request, body, etag)
+
+
+def _matrix_response(schedule: dict, filename: str) -> Response:
+    """Return a stored schedule as a columnar matrix file."""
+    return Response(
+        content=columnar.dumps(columnar.from_schedule(schedule)),
+        media_type=columnar.MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+MATRIX_RESPONSES = {200: {"content": {columnar.MEDIA_TYPE: {}}, "description": "Schedule matrix file"}}
+
+
+@router.get("/latest/export", response_class=Response, responses=MATRIX_RESPONSES)
+def export_latest_schedule() -> Response:
+    """Return the latest schedule as a bit-packed member x date matrix file."""
+    return _matrix_response(schedule_store.load_latest_schedule(), "schedule-latest.npz")
+
+
+@router.post("/import", status_code=status.HTTP_201_CREATED)
+def import_schedule(file: UploadFile = File(...)) -> dict:
+    """Store a schedule matrix file as a new schedule and make it the latest one.
+
+    The upload is spooled to a temporary file and memory-mapped.
     """
-    return load_latest_schedule()
+    try:
+        schedule = columnar.to_schedule(columnar.load_upload(file.file))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to read matrix file: {e}"
+        )
+    schedule_id = schedule_store.save_schedule(schedule)
+    return {"message": f"Schedule {schedule_id} imported", "id": schedule_id}
+
+
+@router.get("/")
+def list_schedules() -> List[int]:
+    """Return the ids of the stored schedules, newest first."""
+    return schedule_store.list_schedule_ids()
+
+
+@router.get("/{schedule_id}")
+def get_schedule(schedule_id: int, request: Request) -> Response:
+    """Return a stored schedule by id."""
+    body = schedule_store.load_schedule_bytes(schedule_id)
+    if body is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Schedule with id {schedule_id} not found"
+        )
+    return _json_response(request, body, schedule_store.make_etag(body))
+
+
+@router.get("/{schedule_id}/export", response_class=Response, responses=MATRIX_RESPONSES)
+def export_schedule(schedule_id: int) -> Response:
+    """Return a stored schedule as a bit-packed member x date matrix file."""
+    body = schedule_store.load_schedule_bytes(schedule_id)
+    if body is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Schedule with id {schedule_id} not found"
+        )
+    return _matrix_response(json.loads(body), f"schedule-{schedule_id}.npz")
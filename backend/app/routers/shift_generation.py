@@ -1,19 +1,51 @@
-from typing import Dict, List
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
 from datetime import date, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-import json
-from pathlib import Path
 
 from ..db import get_db
 from ..models.member import Member
 from ..models.availability import Availability
+from ..services import heuristic, jobs, metrics, schedule_store, scheduler, solvers, validation
+from ..services.availability_index import AvailabilityIndex
+from ..services.solvers import SolverOptions
 
 router = APIRouter(prefix="/shift-generation", tags=["shift-generation"])
 
-# Path to the data file for storing generated schedules
-DATA_FILE = Path(__file__).resolve().parents[2] / "data" / "latest_schedule.json"
+# Objective parameters shared by the ILP endpoints
+FAIRNESS_QUERY = Query(
+    "deviation",
+    pattern="^(deviation|spread)$",
+    description="deviation: total distance of loads from their targets, spread: largest excess plus largest shortfall",
+)
+WEIGHTS_BODY = Body(None, embed=True, description="Relative share of shifts per member name (default 1)")
+FORMAT_QUERY = Query(
+    "full",
+    alias="format",
+    pattern="^(full|compact|ndjson)$",
+    description=(
+        "full: schedule by date and member name, compact: member ids with one member table "
+        "and dates as day offsets, ndjson: one JSON line per date, streamed"
+    ),
+)
+# Alternative bodies returned for FORMAT_QUERY
+FORMAT_RESPONSES = {
+    200: {
+        "content": {
+            "application/json": {},
+            "application/x-ndjson": {},
+        },
+        "description": "The schedule in the requested format",
+    }
+}
+# Dates per chunk of a streamed NDJSON response
+NDJSON_CHUNK_DATES = 64
+# Default solver time limit of a job, as a share of the job timeout; the
+# rest is left for building the model and the response
+JOB_TIME_LIMIT_SHARE = 0.8
 
 
 class ScheduleGenerationResponse(BaseModel):
@@ -23,6 +55,13 @@ class ScheduleGenerationResponse(BaseModel):
     available_dates: List[str]
 
 
+class GenerationJobResponse(BaseModel):
+    job_id: str
+    status: str
+    result: Optional[ScheduleGenerationResponse] = None
+    error: Optional[str] = None
+
+
 def generate_date_range(start_date: date, end_date: date) -> List[date]:
     """Generate a list of dates between start_date and end_date (inclusive)."""
     dates = []
@@ -35,45 +74,92 @@ def generate_date_range(start_date: date, end_date: date) -> List[date]:
 
 def simple_schedule_assignment(
     members: List[Member], 
-    availabilities: Dict[int, List[date]], 
-    dates: List[date]
+    availabilities: Union[AvailabilityIndex, Mapping[int, Iterable[date]]], 
+    dates: List[date],
+    fixed: Optional[Mapping[date, Sequence[int]]] = None,
 ) -> Dict[date, List[str]]:
     """
     Simple round-robin assignment that respects availability.
     This is a basic implementation - could be enhanced with optimization algorithms.
+
+    ``availabilities`` is either an ``AvailabilityIndex`` built over ``members``
+    (in the same order) or a mapping of member id to available dates.
+    Days in ``fixed`` keep the given member ids and only count towards the
+    members' load, which repairs the remaining days of an earlier schedule.
     """
+    if not isinstance(availabilities, AvailabilityIndex):
+        availabilities = AvailabilityIndex.from_mapping(
+            availabilities, member_ids=[m.id for m in members], dates=dates
+        )
+    index = availabilities
+
     schedule = {d: [] for d in dates}
-    member_assignment_count = {m.id: 0 for m in members}
+    member_assignment_count = [0] * len(index.member_ids)
+    members_by_position = {index.member_position(m.id): m for m in members}
+    
+    # Kept days are copied and seed the load of their members
+    fixed = fixed or {}
+    for target_date, member_ids in fixed.items():
+        for member_id in member_ids:
+            position = index.member_position(member_id)
+            schedule[target_date].append(members_by_position[position].name)
+            member_assignment_count[position] += 1
     
     # Target: 4 members per day
     target_per_day = 4
     
     for target_date in dates:
-        available_members = []
-        for member in members:
-            member_available_dates = availabilities.get(member.id, [])
-            if target_date in member_available_dates:
-                available_members.append(member)
-        
-        # Sort available members by their current assignment count (ascending)
-        available_members.sort(key=lambda m: member_assignment_count[m.id])
+        if target_date in fixed:
+            continue
+        # Available members ordered by their current assignment count (ascending)
+        available_positions = index.available_by_load(target_date, member_assignment_count)
         
         # Assign up to target_per_day members
-        assigned_count = 0
-        for member in available_members:
-            if assigned_count >= target_per_day:
-                break
-            
-            schedule[target_date].append(member.name)
-            member_assignment_count[member.id] += 1
-            assigned_count += 1
+        for position in available_positions[:target_per_day]:
+            schedule[target_date].append(members_by_position[position].name)
+            member_assignment_count[position] += 1
     
     return schedule
 
 
-@router.post("/generate", response_model=ScheduleGenerationResponse)
-def generate_shift_schedule(db: Session = Depends(get_db)) -> ScheduleGenerationResponse:
-    """Generate shift schedule based on uploaded availability data."""
+def solver_options(
+    solver: str = Query(
+        "cbc",
+        pattern="^(cbc|highs|cpsat)$",
+        description="ILP backend: cbc, highs or cpsat (OR-Tools)",
+    ),
+    time_limit: Optional[float] = Query(None, gt=0, description="Solver time limit in seconds"),
+    gap_rel: Optional[float] = Query(None, ge=0, description="Stop at this relative MIP gap, e.g. 0.01"),
+    threads: Optional[int] = Query(None, ge=1, description="Solver threads"),
+) -> SolverOptions:
+    """Collect the solver query parameters shared by the ILP endpoints."""
+    if solver not in solvers.available_backends():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Solver '{solver}' is not available on this server"
+        )
+    return SolverOptions(backend=solver, time_limit=time_limit, gap_rel=gap_rel, threads=threads)
+
+
+def _member_weights(
+    members: list,
+    weights: Optional[Dict[str, float]],
+) -> Optional[Dict[int, float]]:
+    """Map per-name weights from a request to member ids."""
+    if not weights:
+        return None
+    ids_by_name = {m.name: m.id for m in members}
+    unknown = sorted(set(weights) - set(ids_by_name))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown members in weights: {', '.join(unknown)}"
+        )
+    return {ids_by_name[name]: weight for name, weight in weights.items()}
+
+
+def _load_greedy_members(db: Session) -> Tuple[List[Member], List[date], AvailabilityIndex]:
+    """Load all members and index all stored availability for the greedy engine."""
     
     # Get all members
     members = db.query(Member).all()
@@ -91,20 +177,115 @@ def generate_shift_schedule(db: Session = Depends(get_db)) -> ScheduleGeneration
             detail="No availability data found. Please upload availability data using CSV first."
         )
     
-    member_availabilities = {}
-    all_unique_dates = set()
-    
+    # Index availability by date so each day only touches available members
+    dates = sorted({availability.date for availability in all_availabilities})
+    index = AvailabilityIndex([m.id for m in members], dates)
     for availability in all_availabilities:
-        if availability.member_id not in member_availabilities:
-            member_availabilities[availability.member_id] = []
-        member_availabilities[availability.member_id].append(availability.date)
-        all_unique_dates.add(availability.date)
-    
-    # Get all unique dates from availability data
-    dates = sorted(list(all_unique_dates))
+        index.add(availability.member_id, availability.date)
+    return members, dates, index
+
+
+def _load_scheduler_members(db: Session) -> Tuple[List[scheduler.Member], List[date]]:
+    """Load members with their availability for the ``services.scheduler`` engines."""
+    members = scheduler.get_members_with_preferences(db)
+    if not members:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No availability data found. Please upload availability data using CSV first."
+        )
+    dates = sorted({d for m in members for d in m.preferred_days})
+    return members, dates
+
+
+def run_generation(
+    engine: str,
+    members: List[scheduler.Member],
+    dates: List[date],
+    options: Optional[SolverOptions] = None,
+    index: Optional[AvailabilityIndex] = None,
+    fixed: Optional[Dict[date, List[int]]] = None,
+    warm_start: Optional[Dict[date, List[int]]] = None,
+    budget_ms: int = heuristic.DEFAULT_BUDGET_MS,
+    fairness: str = "deviation",
+    weights: Optional[Dict[int, float]] = None,
+) -> Tuple[Dict[date, List[str]], List[str], Optional[dict]]:
+    """Run a generation engine.
+
+    Only takes picklable arguments so it can run in a job worker process.
+    The ILP and heuristic engines expect scheduler members; the greedy
+    engine also accepts database members together with their ``index``.
+    ``fixed`` and ``warm_start`` come from ``scheduler.plan_incremental``.
+    ``fairness`` and ``weights`` (by member id) shape the ILP objective.
+    Returns the member names assigned per date, the unapplied rules and the
+    solver outcome (None for the greedy engine).
+    """
+    if engine in ("ilp", "heuristic"):
+        if engine == "ilp":
+            result = scheduler.solve_schedule(
+                members,
+                dates,
+                options=options,
+                fixed=fixed,
+                warm_start=warm_start,
+                fairness=fairness,
+                weights=weights,
+            )
+        else:
+            result = heuristic.solve_heuristic(members, dates, budget_ms=budget_ms, fixed=fixed)
+        names = {m.id: m.name for m in members}
+        daily_assignments = {
+            d: [names[member_id] for member_id in member_ids]
+            for d, member_ids in result["assignments"].items()
+        }
+        return daily_assignments, result["violated_constraints"], result["solver"]
     
-    # Generate schedule
-    daily_assignments = simple_schedule_assignment(members, member_availabilities, dates)
+    if index is None:
+        index = AvailabilityIndex.from_members(members, dates)
+    daily_assignments = simple_schedule_assignment(members, index, dates, fixed=fixed)
+    ids_by_name = {m.name: m.id for m in members}
+    violations = validation.validate_schedule(
+        members,
+        dates,
+        {d: [ids_by_name[name] for name in names] for d, names in daily_assignments.items()},
+    )
+    return daily_assignments, violations, None
+
+
+def _incremental_plan(
+    members: list,
+    index: AvailabilityIndex,
+    dates: List[date],
+) -> Tuple[Dict[date, List[int]], Dict[date, List[int]]]:
+    """Plan an incremental run against the latest stored schedule."""
+    ids_by_name = {m.name: m.id for m in members}
+    previous = {
+        date.fromisoformat(date_str): [ids_by_name.get(name) for name in names]
+        for date_str, names in schedule_store.load_latest_schedule().get("dates", {}).items()
+    }
+    return scheduler.plan_incremental(previous, index, dates)
+
+
+def _build_response(
+    members: list,
+    dates: List[date],
+    daily_assignments: Dict[date, List[str]],
+    unapplied_rules: List[str],
+    solver_info: Optional[dict] = None,
+    index: Optional[AvailabilityIndex] = None,
+    response_format: str = "full",
+) -> Union[ScheduleGenerationResponse, Response]:
+    """Format a generated schedule for the frontend and save it as the latest one.
+
+    ``diagnosis`` lists the days whose available members cannot meet the
+    rules, with their supply counts; ``index`` is built from the scheduler
+    members if not given. The stored schedule is always in the full format;
+    ``response_format`` only changes the response, see :func:`_compact_body`
+    and :func:`_ndjson_chunks`.
+    """
+    with metrics.stage("diagnose"):
+        if index is None:
+            index = AvailabilityIndex.from_members(members, dates)
+        diagnosis = validation.diagnose_days(index, members)
     
     # Format for frontend (convert dates to strings)
     formatted_dates = {}
@@ -131,17 +312,277 @@ def generate_shift_schedule(db: Session = Depends(get_db)) -> ScheduleGeneration
         "assign_count": member_assignment_count,
         "committee_count": committee_count,
         "gender_count": gender_count,
-        "unapplied_rules": []  # Could add constraint violations here
+        "unapplied_rules": unapplied_rules,
+        "diagnosis": diagnosis,
     }
+    if solver_info is not None:
+        schedule_data["solver"] = solver_info
+    
+    # Store atomically; also served by the /schedules/latest endpoint
+    with metrics.stage("store"):
+        schedule_id = schedule_store.save_schedule(schedule_data)
     
-    # Save to data file for the /schedules/latest endpoint
-    DATA_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with DATA_FILE.open("w", encoding="utf-8") as f:
-        json.dump(schedule_data, f, indent=2)
+    message = f"Schedule {schedule_id} generated successfully for {len(dates)} dates"
+    if response_format == "compact":
+        body = _compact_body(message, members, dates, daily_assignments, schedule_data)
+        return Response(content=schedule_store.dumps(body), media_type="application/json")
+    if response_format == "ndjson":
+        return StreamingResponse(
+            _ndjson_chunks(message, daily_assignments, schedule_data),
+            media_type="application/x-ndjson",
+        )
     
     return ScheduleGenerationResponse(
-        message=f"Schedule generated successfully for {len(dates)} dates",
+        message=message,
         schedule=schedule_data,
         member_assignments=member_assignment_count,
         available_dates=[d.isoformat() for d in dates]
-    )
\ No newline at end of file
+    )
+
+
+def _compact_body(
+    message: str,
+    members: list,
+    dates: List[date],
+    daily_assignments: Dict[date, List[str]],
+    schedule_data: dict,
+) -> dict:
+    """Return the schedule with member ids and day offsets instead of names and dates.
+
+    ``members`` lists every member once as ``[id, name]``; ``assign_count``
+    follows the same order. ``offsets[k]`` is the number of days from
+    ``start`` to the date staffed by ``assignments[k]``.
+    """
+    ids_by_name = {m.name: m.id for m in members}
+    days = sorted(daily_assignments)
+    start = min(days[:1] + dates[:1])
+    counts = schedule_data["assign_count"]
+    return {
+        "message": message,
+        "id": schedule_data["id"],
+        "start": start.isoformat(),
+        "members": [[m.id, m.name] for m in members],
+        "assign_count": [counts.get(m.name, 0) for m in members],
+        "offsets": [(d - start).days for d in days],
+        "assignments": [[ids_by_name[name] for name in daily_assignments[d]] for d in days],
+        "committee_count": schedule_data["committee_count"],
+        "gender_count": schedule_data["gender_count"],
+        "unapplied_rules": schedule_data["unapplied_rules"],
+        "diagnosis": schedule_data["diagnosis"],
+        **({"solver": schedule_data["solver"]} if "solver" in schedule_data else {}),
+    }
+
+
+def _ndjson_chunks(
+    message: str,
+    daily_assignments: Dict[date, List[str]],
+    schedule_data: dict,
+) -> Iterator[bytes]:
+    """Yield the schedule as NDJSON, a few dozen dates per chunk.
+
+    The first line holds the message and schedule id, then one line per
+    date gives its members, and the last line holds the counts, unapplied
+    rules and solver outcome.
+    """
+    yield schedule_store.dumps({"message": message, "id": schedule_data["id"]}) + b"\n"
+    days = sorted(daily_assignments)
+    for k in range(0, len(days), NDJSON_CHUNK_DATES):
+        yield b"".join(
+            schedule_store.dumps({"date": d.isoformat(), "members": daily_assignments[d]}) + b"\n"
+            for d in days[k:k + NDJSON_CHUNK_DATES]
+        )
+    summary = {key: value for key, value in schedule_data.items() if key not in ("dates", "id")}
+    yield schedule_store.dumps(summary) + b"\n"
+
+
+@router.post("/generate", response_model=ScheduleGenerationResponse, responses=FORMAT_RESPONSES)
+def generate_shift_schedule(
+    engine: str = Query(
+        "greedy",
+        pattern="^(greedy|heuristic|ilp)$",
+        description=(
+            "greedy: round-robin assignment, heuristic: constructive pass and local search "
+            "within budget_ms, ilp: optimize with the PuLP model"
+        ),
+    ),
+    incremental: bool = Query(
+        False,
+        description="Keep unaffected days of the latest schedule and re-solve only changed days",
+    ),
+    budget_ms: int = Query(
+        heuristic.DEFAULT_BUDGET_MS, ge=1, le=60000, description="Time budget of the heuristic engine"
+    ),
+    fairness: str = FAIRNESS_QUERY,
+    weights: Optional[Dict[str, float]] = WEIGHTS_BODY,
+    response_format: str = FORMAT_QUERY,
+    options: SolverOptions = Depends(solver_options),
+    db: Session = Depends(get_db),
+) -> ScheduleGenerationResponse:
+    """Generate shift schedule based on uploaded availability data.
+
+    With ``incremental``, days of the latest schedule that are still valid
+    are kept and only the changed days and their neighbours are re-solved.
+    The solver parameters only apply to the ILP engine; when its time limit
+    is hit, the best schedule found so far is returned with its gap. The ILP
+    spreads shifts evenly, optionally weighted per member name in the body,
+    e.g. ``{"weights": {"立田": 2}}``.
+    """
+    with metrics.stage("db_load"):
+        if engine in ("ilp", "heuristic"):
+            members, dates = _load_scheduler_members(db)
+            index = AvailabilityIndex.from_members(members, dates)
+        else:
+            members, dates, index = _load_greedy_members(db)
+    
+    fixed = warm_start = None
+    if incremental:
+        with metrics.stage("incremental_plan"):
+            fixed, warm_start = _incremental_plan(members, index, dates)
+    
+    try:
+        with metrics.stage("generate"):
+            daily_assignments, unapplied_rules, solver_info = run_generation(
+                engine,
+                members,
+                dates,
+                options,
+                index=index,
+                fixed=fixed,
+                warm_start=warm_start,
+                budget_ms=budget_ms,
+                fairness=fairness,
+                weights=_member_weights(members, weights),
+            )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    metrics.inc("shift_generations_total", engine=engine)
+    
+    return _build_response(
+        members,
+        dates,
+        daily_assignments,
+        unapplied_rules,
+        solver_info,
+        index=index,
+        response_format=response_format,
+    )
+
+
+@router.post("/batch", response_model=ScheduleGenerationResponse, responses=FORMAT_RESPONSES)
+def generate_batch_schedule(
+    start: date,
+    end: date,
+    workers: Optional[int] = Query(None, ge=1, description="Worker processes; defaults to the CPU count"),
+    fairness: str = FAIRNESS_QUERY,
+    weights: Optional[Dict[str, float]] = WEIGHTS_BODY,
+    response_format: str = FORMAT_QUERY,
+    options: SolverOptions = Depends(solver_options),
+    db: Session = Depends(get_db),
+) -> ScheduleGenerationResponse:
+    """Generate a multi-month schedule with the ILP, solving months in parallel.
+
+    The solver parameters, including the time limit, apply to each month.
+    """
+    if end < start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end must not be before start"
+        )
+    with metrics.stage("db_load"):
+        members = scheduler.get_members_with_preferences(db, start, end)
+    if not members:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No availability data found in the requested range."
+        )
+    dates = sorted({d for m in members for d in m.preferred_days})
+    
+    try:
+        with metrics.stage("generate"):
+            result = scheduler.solve_schedule_range(
+                members,
+                dates,
+                max_workers=workers,
+                options=options,
+                fairness=fairness,
+                weights=_member_weights(members, weights),
+            )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    metrics.inc("shift_generations_total", engine="batch")
+    
+    names = {m.id: m.name for m in members}
+    daily_assignments = {
+        d: [names[member_id] for member_id in member_ids]
+        for d, member_ids in result["assignments"].items()
+    }
+    return _build_response(
+        members,
+        dates,
+        daily_assignments,
+        result["violated_constraints"],
+        result["solver"],
+        response_format=response_format,
+    )
+
+
+@router.post(
+    "/jobs",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=GenerationJobResponse,
+)
+def submit_generation_job(
+    engine: str = Query(
+        "ilp",
+        pattern="^(greedy|heuristic|ilp)$",
+        description=(
+            "greedy: round-robin assignment, heuristic: constructive pass and local search "
+            "within budget_ms, ilp: optimize with the PuLP model"
+        ),
+    ),
+    fairness: str = FAIRNESS_QUERY,
+    weights: Optional[Dict[str, float]] = WEIGHTS_BODY,
+    options: SolverOptions = Depends(solver_options),
+    db: Session = Depends(get_db),
+) -> GenerationJobResponse:
+    """Start schedule generation in a worker process and return its job id.
+
+    The solver time limit defaults to ``JOB_TIME_LIMIT_SHARE`` of the job
+    timeout, so a slow solve still returns its best schedule before the
+    job times out. A result arriving after the timeout is kept as well.
+    """
+    members, dates = _load_scheduler_members(db)
+    if options.time_limit is None:
+        options.time_limit = JOB_TIME_LIMIT_SHARE * jobs.job_manager.timeout
+    job = jobs.job_manager.submit(
+        partial(run_generation, fairness=fairness, weights=_member_weights(members, weights)),
+        engine,
+        members,
+        dates,
+        options,
+        on_result=lambda result: _build_response(members, dates, *result),
+    )
+    return GenerationJobResponse(job_id=job.id, status=job.status)
+
+
+@router.get("/jobs/{job_id}", response_model=GenerationJobResponse)
+def get_generation_job(job_id: str) -> GenerationJobResponse:
+    """Report the status of a generation job and its result once done."""
+    job = jobs.job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job {job_id} not found"
+        )
+    return GenerationJobResponse(
+        job_id=job.id,
+        status=job.status,
+        result=job.result,
+        error=job.error,
+    )
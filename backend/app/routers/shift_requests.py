@@ -1,13 +1,12 @@
-from typing import List
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..db import Base, engine, get_db
+from ..db import get_async_db, init_db
 from ..models.shift_request import ShiftRequest
-from ..services import shift_importer
+from ..services import csv_stream, shift_importer
 from pydantic import BaseModel
 
-Base.metadata.create_all(bind=engine)
+init_db()
 
 router = APIRouter(prefix="/shift-requests", tags=["shift-requests"])
 
@@ -28,16 +27,19 @@ class UploadResponse(BaseModel):
 )
 async def upload_shift_requests(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ) -> UploadResponse:
+    """Import shift requests; the file is parsed in worker threads."""
     try:
-        shift_requests: List[ShiftRequest] = shift_importer.parse_shift_requests(file)
-        for req in shift_requests:
-            db.add(req)
-        db.commit()
-        return UploadResponse(message="Upload successful", count=len(shift_requests))
+        count = 0
+        rows = shift_importer.iter_shift_request_rows(file.file)
+        async for batch in csv_stream.iterate_in_thread(csv_stream.batched(rows)):
+            await db.execute(ShiftRequest.__table__.insert(), batch)
+            count += len(batch)
+        await db.commit()
+        return UploadResponse(message="Upload successful", count=count)
     except Exception as e:  # pragma: no cover - simple error handling
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e),
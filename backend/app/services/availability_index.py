@@ -0,0 +1,140 @@
+"""Bitset index of member availability used by the schedule generators."""
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Yield the positions of the set bits of ``mask`` in ascending order."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class AvailabilityIndex:
+    """Member availability stored as per-date and per-member bitmasks.
+
+    Members and dates are mapped to integer positions. For every date the
+    index keeps an integer whose bit ``i`` is set when the member at position
+    ``i`` is available, and for every member an integer whose bit ``j`` is set
+    when the member is available on the date at position ``j``. Questions such
+    as "who can work on date D" then only touch the available members instead
+    of scanning the whole roster.
+
+    Parameters
+    ----------
+    member_ids: Sequence[int]
+        Member identifiers. Their order defines the member positions and is
+        used to break ties when ordering by load.
+    dates: Sequence[date]
+        Dates covered by the index. Their order defines the date positions.
+    """
+
+    def __init__(self, member_ids: Sequence[int], dates: Sequence[date]) -> None:
+        self.member_ids: List[int] = list(member_ids)
+        self.dates: List[date] = list(dates)
+        self._member_pos: Dict[int, int] = {
+            member_id: i for i, member_id in enumerate(self.member_ids)
+        }
+        self._date_pos: Dict[date, int] = {d: j for j, d in enumerate(self.dates)}
+        self._by_date: List[int] = [0] * len(self.dates)
+        self._by_member: List[int] = [0] * len(self.member_ids)
+
+    @classmethod
+    def from_mapping(
+        cls,
+        availabilities: Mapping[int, Iterable[date]],
+        member_ids: Optional[Sequence[int]] = None,
+        dates: Optional[Sequence[date]] = None,
+    ) -> "AvailabilityIndex":
+        """Build an index from a ``member_id -> dates`` mapping.
+
+        When ``dates`` is omitted, every date that appears in the mapping is
+        indexed in ascending order. Dates outside ``dates`` and members
+        outside ``member_ids`` are ignored.
+        """
+        if member_ids is None:
+            member_ids = list(availabilities)
+        if dates is None:
+            dates = sorted({d for days in availabilities.values() for d in days})
+        index = cls(member_ids, dates)
+        for member_id, days in availabilities.items():
+            for d in days:
+                index.add(member_id, d)
+        return index
+
+    @classmethod
+    def from_members(cls, members: Sequence, dates: Sequence[date]) -> "AvailabilityIndex":
+        """Build an index from scheduler members and their preferred days.
+
+        A member without preferred days is treated as available on every
+        date, matching ``scheduler.Member.is_available``.
+        """
+        index = cls([m.id for m in members], dates)
+        all_dates = (1 << len(index.dates)) - 1
+        for i, member in enumerate(members):
+            if not member.preferred_days:
+                index._by_member[i] = all_dates
+                for j in range(len(index.dates)):
+                    index._by_date[j] |= 1 << i
+                continue
+            for d in member.preferred_days:
+                index.add(member.id, d)
+        return index
+
+    def add(self, member_id: int, day: date) -> None:
+        """Mark ``member_id`` as available on ``day``."""
+        i = self._member_pos.get(member_id)
+        j = self._date_pos.get(day)
+        if i is None or j is None:
+            return
+        self._by_date[j] |= 1 << i
+        self._by_member[i] |= 1 << j
+
+    def member_position(self, member_id: int) -> int:
+        """Return the position of ``member_id`` in the index."""
+        return self._member_pos[member_id]
+
+    def date_position(self, day: date) -> int:
+        """Return the position of ``day`` in the index."""
+        return self._date_pos[day]
+
+    def is_available(self, member_id: int, day: date) -> bool:
+        """Return True if the member is available on ``day``."""
+        i = self._member_pos.get(member_id)
+        j = self._date_pos.get(day)
+        if i is None or j is None:
+            return False
+        return bool(self._by_date[j] >> i & 1)
+
+    def date_mask(self, day: date) -> int:
+        """Return the bitmask of member positions available on ``day``."""
+        j = self._date_pos.get(day)
+        return 0 if j is None else self._by_date[j]
+
+    def member_mask(self, member_id: int) -> int:
+        """Return the bitmask of date positions on which the member is available."""
+        i = self._member_pos.get(member_id)
+        return 0 if i is None else self._by_member[i]
+
+    def available_positions(self, day: date) -> List[int]:
+        """Return the positions of the members available on ``day``."""
+        return list(iter_bits(self.date_mask(day)))
+
+    def available_members(self, day: date) -> List[int]:
+        """Return the ids of the members available on ``day``."""
+        return [self.member_ids[i] for i in iter_bits(self.date_mask(day))]
+
+    def available_count(self, day: date) -> int:
+        """Return the number of members available on ``day``."""
+        return bin(self.date_mask(day)).count("1")
+
+    def available_by_load(self, day: date, load: Sequence[int]) -> List[int]:
+        """Return positions of members available on ``day`` ordered by load.
+
+        ``load`` is indexed by member position. Ties keep the member order
+        the index was built with.
+        """
+        return sorted(iter_bits(self.date_mask(day)), key=load.__getitem__)
@@ -0,0 +1,215 @@
+"""Vectorized parser for wide availability sheets such as ``Shift_4.csv``.
+
+The header row names the members; each following row starts with a date
+and holds one symbol per member. Every cell is mapped to a code through a
+symbol lookup table while the rows are read, so the date x member block
+ends up in a single ``uint8`` array. Invalid cells are returned as
+coordinate arrays and all dates are parsed together afterwards.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from itertools import repeat
+from typing import BinaryIO, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import csv_stream
+
+AVAILABLE_SYMBOLS = ("○", "o", "O", "1", "true", "True", "available")
+UNAVAILABLE_SYMBOLS = ("×", "x", "X", "0", "false", "False", "not available")
+
+# Cell codes; cells missing at the end of a short row count as unavailable
+UNAVAILABLE, AVAILABLE, INVALID = 0, 1, 2
+
+_SYMBOLS = {
+    **{symbol: AVAILABLE for symbol in AVAILABLE_SYMBOLS},
+    **{symbol: UNAVAILABLE for symbol in UNAVAILABLE_SYMBOLS},
+}
+
+_DATE = re.compile(r"([0-9]{4})([/-])([0-9]{1,2})\2([0-9]{1,2})")
+
+# Rows converted to codes per block
+BLOCK_ROWS = 256
+
+
+@dataclass
+class Sheet:
+    """Parsed availability sheet.
+
+    ``codes`` has one row per data row with a date cell and one column per
+    member of ``member_names``. ``dates`` is NaT where the date could not
+    be parsed. Invalid cells are given by ``invalid_cells`` (row and member
+    positions) with their stripped text in ``invalid_values``.
+    """
+
+    member_names: List[str]
+    row_numbers: np.ndarray
+    date_strings: List[str]
+    dates: np.ndarray
+    codes: np.ndarray
+    invalid_cells: Tuple[np.ndarray, np.ndarray]
+    invalid_values: List[str] = field(default_factory=list)
+
+    @property
+    def valid_rows(self) -> np.ndarray:
+        """Mask of the rows whose date was parsed."""
+        return ~np.isnat(self.dates)
+
+    def available_by_date(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the distinct valid dates and the members available on each.
+
+        Rows repeating a date are merged; a member is available if any of
+        them says so.
+        """
+        valid = self.valid_rows
+        dates, inverse = np.unique(self.dates[valid], return_inverse=True)
+        available = np.zeros((len(dates), len(self.member_names)), dtype=bool)
+        np.logical_or.at(available, inverse, self.codes[valid] == AVAILABLE)
+        return dates, available
+
+    def invalid_by_date(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the distinct valid dates and the members with an invalid cell on each.
+
+        A member counts only if no row of the date marks them available.
+        """
+        valid = self.valid_rows
+        dates, inverse = np.unique(self.dates[valid], return_inverse=True)
+        invalid = np.zeros((len(dates), len(self.member_names)), dtype=bool)
+        np.logical_or.at(invalid, inverse, self.codes[valid] == INVALID)
+        return dates, invalid & ~self.available_by_date()[1]
+
+
+def diff(
+    member_ids: np.ndarray,
+    dates: np.ndarray,
+    available: np.ndarray,
+    stored_member_ids: np.ndarray,
+    stored_dates: np.ndarray,
+    unknown: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Compare an uploaded availability matrix with stored availability.
+
+    Parameters
+    ----------
+    member_ids: np.ndarray
+        Ids of the uploaded members; negative ids are left out.
+    dates: np.ndarray
+        Sorted distinct ``datetime64[D]`` dates of the upload.
+    available: np.ndarray
+        Boolean members x dates matrix, as from :meth:`Sheet.available_by_date`
+        transposed.
+    stored_member_ids, stored_dates: np.ndarray
+        Stored (member, date) pairs. Pairs of other members or outside the
+        uploaded date range are ignored.
+    unknown: Optional[np.ndarray]
+        Boolean members x dates matrix of cells whose value is not known,
+        such as invalid cells; they are neither inserted nor deleted.
+
+    Returns
+    -------
+    days: np.ndarray
+        Every day from the first to the last uploaded date. Days inside the
+        range that the upload does not list count as unavailable.
+    inserts, deletes: np.ndarray
+        Boolean members x days matrices of the pairs to add and to remove.
+    """
+    member_ids = np.asarray(member_ids, dtype=np.int64)
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    if not len(dates):
+        empty = np.zeros((len(member_ids), 0), dtype=bool)
+        return dates, empty, empty
+    days = np.arange(dates[0], dates[-1] + 1)
+    uploaded = np.zeros((len(member_ids), len(days)), dtype=bool)
+    uploaded[:, (dates - days[0]).astype(np.int64)] = available
+    uploaded &= (member_ids >= 0)[:, None]
+    known = np.ones_like(uploaded)
+    if unknown is not None:
+        known[:, (dates - days[0]).astype(np.int64)] = ~np.asarray(unknown, dtype=bool)
+
+    stored = np.zeros_like(uploaded)
+    if len(member_ids):
+        stored_member_ids = np.asarray(stored_member_ids, dtype=np.int64)
+        offsets = (np.asarray(stored_dates, dtype="datetime64[D]") - days[0]).astype(np.int64)
+        order = np.argsort(member_ids)
+        found = np.searchsorted(member_ids, stored_member_ids, sorter=order)
+        rows = order[np.minimum(found, len(order) - 1)]
+        keep = (member_ids[rows] == stored_member_ids) & (offsets >= 0) & (offsets < len(days))
+        stored[rows[keep], offsets[keep]] = True
+    return days, uploaded & ~stored & known, stored & ~uploaded & known
+
+
+def parse_dates(values: Sequence[str]) -> np.ndarray:
+    """Parse ``YYYY/M/D`` or ``YYYY-MM-DD`` strings; invalid ones become NaT."""
+    parts = np.zeros((len(values), 3), dtype=np.int64)
+    for k, value in enumerate(values):
+        match = _DATE.fullmatch(value)
+        if match:
+            parts[k] = match[1], match[3], match[4]
+    year, month, day = parts.T
+    months = (year - 1970) * 12 + month - 1
+    dates = months.astype("datetime64[M]").astype("datetime64[D]") + (day - 1)
+    valid = (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1)
+    # Days past the end of the month roll over into the next one
+    valid &= dates.astype("datetime64[M]") == months.astype("datetime64[M]")
+    return np.where(valid, dates, np.datetime64("NaT", "D"))
+
+
+def parse(file: BinaryIO) -> Sheet:
+    """Read an availability sheet from a binary file object.
+
+    Rows with fewer than two cells or an empty date cell are skipped.
+    Cells beyond the named members are ignored.
+    """
+    with csv_stream.open_reader(file) as reader:
+        header = next(reader, [])
+        member_names = [name.strip() for name in header[1:] if name.strip()]
+        width = len(member_names)
+        lookup = _SYMBOLS.get
+
+        row_numbers: List[int] = []
+        date_strings: List[str] = []
+        blocks: List[np.ndarray] = []
+        invalid_rows: List[int] = []
+        invalid_columns: List[int] = []
+        invalid_values: List[str] = []
+        for chunk in csv_stream.batched(enumerate(reader, start=2), BLOCK_ROWS):
+            block = np.zeros((len(chunk), width), dtype=np.uint8)
+            k = 0
+            for row_num, row in chunk:
+                if len(row) < 2:
+                    continue
+                date_str = row[0].strip()
+                if not date_str:
+                    continue
+                cells = row[1:width + 1]
+                codes = list(map(lookup, cells, repeat(INVALID)))
+                if INVALID in codes:
+                    # Retry with surrounding whitespace removed
+                    for j, code in enumerate(codes):
+                        if code == INVALID:
+                            value = cells[j].strip()
+                            codes[j] = lookup(value, INVALID)
+                            if codes[j] == INVALID:
+                                invalid_rows.append(len(row_numbers))
+                                invalid_columns.append(j)
+                                invalid_values.append(value)
+                block[k, :len(codes)] = codes
+                row_numbers.append(row_num)
+                date_strings.append(date_str)
+                k += 1
+            blocks.append(block[:k])
+
+    return Sheet(
+        member_names=member_names,
+        row_numbers=np.array(row_numbers, dtype=np.int64),
+        date_strings=date_strings,
+        dates=parse_dates(date_strings),
+        codes=np.concatenate(blocks) if blocks else np.zeros((0, width), dtype=np.uint8),
+        invalid_cells=(
+            np.array(invalid_rows, dtype=np.int64),
+            np.array(invalid_columns, dtype=np.int64),
+        ),
+        invalid_values=invalid_values,
+    )
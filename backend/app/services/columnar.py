@@ -0,0 +1,253 @@
+"""Columnar binary files for availability matrices and schedules.
+
+A file is an uncompressed NumPy ``.npz`` archive holding a member x date
+boolean matrix together with its header arrays:
+
+* ``kind``: ``availability`` or ``schedule``, and the format ``version``
+* ``member_ids`` (int64, -1 when unknown) and ``member_names`` (unicode)
+* ``dates`` (``datetime64[D]``)
+* ``bits``: the matrix packed with ``np.packbits`` along the dates, eight
+  days per byte
+* ``meta``: JSON text with any other fields, such as a schedule's
+  unapplied rules
+
+The archive members are stored without compression, so :func:`load` can
+memory-map the arrays straight from the file; only the pages touched are
+read. Uploads go through :func:`load_upload`, which spools them to a
+temporary file first.
+"""
+from __future__ import annotations
+
+import io
+import json
+import shutil
+import struct
+import tempfile
+import zipfile
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Sequence, Union
+
+import numpy as np
+
+FORMAT_VERSION = 1
+KINDS = ("availability", "schedule")
+MEDIA_TYPE = "application/octet-stream"
+
+# Fixed part of a ZIP local file header; name and extra field lengths at 26
+_LOCAL_HEADER = struct.Struct("<4s5H3I2H")
+
+
+@dataclass
+class MemberDateMatrix:
+    """Member x date boolean matrix with its member table and dates."""
+
+    kind: str
+    member_ids: np.ndarray
+    member_names: np.ndarray
+    dates: np.ndarray
+    bits: np.ndarray
+    meta: dict = field(default_factory=dict)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Unpacked boolean matrix, members by dates."""
+        return np.unpackbits(self.bits, axis=1, count=len(self.dates)).view(bool)
+
+    def date_list(self) -> List[date]:
+        """Dates as ``datetime.date`` objects."""
+        return self.dates.astype(object).tolist()
+
+
+def pack(
+    kind: str,
+    member_ids: Sequence[int],
+    member_names: Sequence[str],
+    dates: Sequence[date],
+    matrix: np.ndarray,
+    meta: dict = None,
+) -> MemberDateMatrix:
+    """Build a :class:`MemberDateMatrix` from a boolean members x dates matrix."""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown matrix kind '{kind}'")
+    matrix = np.asarray(matrix, dtype=bool).reshape(len(member_names), len(dates))
+    return MemberDateMatrix(
+        kind=kind,
+        member_ids=np.asarray(member_ids, dtype=np.int64),
+        member_names=np.asarray(member_names, dtype=str),
+        dates=np.asarray(dates, dtype="datetime64[D]"),
+        bits=np.packbits(matrix, axis=1),
+        meta=meta or {},
+    )
+
+
+def dumps(table: MemberDateMatrix) -> bytes:
+    """Serialize ``table`` as an uncompressed ``.npz`` archive."""
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        kind=np.array(table.kind),
+        version=np.array(FORMAT_VERSION),
+        member_ids=table.member_ids,
+        member_names=table.member_names,
+        dates=table.dates,
+        bits=table.bits,
+        meta=np.array(json.dumps(table.meta, ensure_ascii=False)),
+    )
+    return buffer.getvalue()
+
+
+def save(table: MemberDateMatrix, path: Union[str, Path]) -> None:
+    """Write ``table`` to ``path``."""
+    Path(path).write_bytes(dumps(table))
+
+
+def _from_arrays(arrays: Dict[str, np.ndarray]) -> MemberDateMatrix:
+    missing = {"kind", "version", "member_ids", "member_names", "dates", "bits"} - set(arrays)
+    if missing:
+        raise ValueError(f"Not a member x date matrix file, missing: {', '.join(sorted(missing))}")
+    version = int(arrays["version"])
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Unsupported matrix file version {version}")
+    table = MemberDateMatrix(
+        kind=str(arrays["kind"]),
+        member_ids=arrays["member_ids"],
+        member_names=arrays["member_names"],
+        dates=arrays["dates"].astype("datetime64[D]", copy=False),
+        bits=arrays["bits"],
+        meta=json.loads(str(arrays["meta"])) if "meta" in arrays else {},
+    )
+    if table.kind not in KINDS:
+        raise ValueError(f"Unknown matrix kind '{table.kind}'")
+    expected = (len(table.member_names), (len(table.dates) + 7) // 8)
+    if len(table.member_ids) != expected[0] or table.bits.shape != expected:
+        raise ValueError("Matrix shape does not match the member table and dates")
+    return table
+
+
+def loads(file: Union[bytes, BinaryIO]) -> MemberDateMatrix:
+    """Read a matrix file from bytes or a seekable binary file object."""
+    if isinstance(file, bytes):
+        file = io.BytesIO(file)
+    try:
+        with np.load(file, allow_pickle=False) as archive:
+            return _from_arrays({name: archive[name] for name in archive.files})
+    except (OSError, zipfile.BadZipFile) as e:
+        raise ValueError(f"Not a matrix file: {e}") from e
+
+
+def _memmap_arrays(path: Path) -> Dict[str, np.ndarray]:
+    """Map the arrays of an uncompressed ``.npz`` archive without reading them."""
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{info.filename} is compressed and cannot be mapped")
+            f.seek(info.header_offset)
+            header = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+            f.seek(info.header_offset + _LOCAL_HEADER.size + header[-2] + header[-1])
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename.removesuffix(".npy")
+            if not shape or 0 in shape:
+                # Scalars and empty arrays cannot be mapped; they are tiny anyway
+                count = int(np.prod(shape))
+                arrays[name] = np.frombuffer(
+                    f.read(count * dtype.itemsize), dtype=dtype, count=count
+                ).reshape(shape)
+                continue
+            arrays[name] = np.memmap(
+                path,
+                dtype=dtype,
+                mode="r",
+                offset=f.tell(),
+                shape=shape,
+                order="F" if fortran_order else "C",
+            )
+    return arrays
+
+
+def load(path: Union[str, Path], mmap: bool = True) -> MemberDateMatrix:
+    """Read a matrix file, memory-mapping its arrays unless ``mmap`` is False."""
+    path = Path(path)
+    if not mmap:
+        with open(path, "rb") as f:
+            return loads(f)
+    return _from_arrays(_memmap_arrays(path))
+
+
+def load_upload(file: BinaryIO) -> MemberDateMatrix:
+    """Read an uploaded matrix file, memory-mapping its arrays.
+
+    The upload is copied to a temporary file that :func:`load` maps and
+    that is removed again right away; on POSIX systems the mapping stays
+    valid. Compressed archives cannot be mapped and are read into memory.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".npz") as spool:
+        shutil.copyfileobj(file, spool)
+        spool.flush()
+        spool.seek(0)
+        try:
+            with zipfile.ZipFile(spool) as archive:
+                stored = all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist())
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"Not a matrix file: {e}") from e
+        spool.seek(0)
+        return load(spool.name) if stored else loads(spool)
+
+
+def from_schedule(schedule: dict) -> MemberDateMatrix:
+    """Convert a stored schedule (see ``schedule_store``) into a matrix.
+
+    Stored schedules only name their members, so ``member_ids`` are -1.
+    The fields other than ``dates``, ``assign_count`` and ``id`` go to
+    ``meta``.
+    """
+    by_date = schedule.get("dates", {})
+    names = list(schedule.get("assign_count", {}))
+    known = set(names)
+    for staff in by_date.values():
+        for name in staff:
+            if name not in known:
+                known.add(name)
+                names.append(name)
+    position = {name: i for i, name in enumerate(names)}
+    days = sorted(by_date)
+    matrix = np.zeros((len(names), len(days)), dtype=bool)
+    for j, day in enumerate(days):
+        matrix[[position[name] for name in by_date[day]], j] = True
+    meta = {key: value for key, value in schedule.items() if key not in ("dates", "assign_count", "id")}
+    return pack(
+        "schedule",
+        [-1] * len(names),
+        names,
+        [date.fromisoformat(day) for day in days],
+        matrix,
+        meta,
+    )
+
+
+def to_schedule(table: MemberDateMatrix) -> dict:
+    """Convert a schedule matrix back into the stored schedule format.
+
+    The members of each date are listed in the order of the member table.
+    """
+    if table.kind != "schedule":
+        raise ValueError(f"Expected a schedule matrix, got '{table.kind}'")
+    matrix = table.matrix
+    names = np.asarray(table.member_names)
+    counts = matrix.sum(axis=1)
+    return {
+        "dates": {
+            day.isoformat(): names[matrix[:, j]].tolist()
+            for j, day in enumerate(table.date_list())
+        },
+        "assign_count": {
+            name: int(count) for name, count in zip(names.tolist(), counts.tolist()) if count
+        },
+        **table.meta,
+    }
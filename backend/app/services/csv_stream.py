@@ -0,0 +1,67 @@
+"""Streaming readers for uploaded CSV files.
+
+Uploaded files are decoded incrementally instead of being read and decoded
+in full, so memory use does not grow with the size of the upload. The UTF-8
+BOM written by spreadsheet exports such as ``Shift_*.csv`` is stripped.
+Async routers advance the readers with :func:`iterate_in_thread`, so file
+reads and parsing stay off the event loop.
+"""
+from __future__ import annotations
+
+import csv
+import io
+from contextlib import contextmanager
+from itertools import islice
+from typing import AsyncIterator, BinaryIO, Iterable, Iterator, List, TypeVar
+
+from anyio import to_thread
+
+T = TypeVar("T")
+
+# Number of rows handed to the database per batch
+BATCH_SIZE = 1000
+
+
+@contextmanager
+def open_reader(file: BinaryIO, dict_rows: bool = False) -> Iterator[Iterator]:
+    """Open a CSV reader that decodes ``file`` as it is iterated.
+
+    Parameters
+    ----------
+    file: BinaryIO
+        Binary file object, usually ``UploadFile.file``.
+    dict_rows: bool
+        Yield rows as dictionaries keyed by the header row.
+
+    The underlying file is left open when the context exits.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        yield csv.DictReader(text) if dict_rows else csv.reader(text)
+    finally:
+        text.detach()
+
+
+def batched(iterable: Iterable[T], size: int = BATCH_SIZE) -> Iterator[List[T]]:
+    """Yield lists of at most ``size`` consecutive items from ``iterable``."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+async def iterate_in_thread(iterable: Iterable[T], chunk: int = 16) -> AsyncIterator[T]:
+    """Yield the items of a blocking iterable, advancing it in a worker thread.
+
+    Up to ``chunk`` items are taken per thread hop; a hop costs about as
+    much as parsing a few hundred rows, so iterate over batches of rows.
+    """
+    iterator = iter(iterable)
+    while True:
+        items = await to_thread.run_sync(list, islice(iterator, chunk))
+        if not items:
+            return
+        for item in items:
+            yield item
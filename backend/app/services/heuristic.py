@@ -0,0 +1,227 @@
+"""Heuristic schedule engine between the greedy assignment and the ILP.
+
+A constructive pass staffs the days in calendar order. It covers the
+committee and gender rules first and never schedules a member on two
+consecutive days. Simulated annealing then evens out the members' loads
+with replace and add moves until a time budget runs out. Rules the
+constructive pass could not meet are penalized heavily, so the search
+repairs them first.
+
+The state is a member x day boolean matrix with per-member loads and
+per-day counters, so every move is evaluated in constant time.
+"""
+from __future__ import annotations
+
+import math
+import random
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from . import metrics, solvers, validation
+from .availability_index import AvailabilityIndex, iter_bits
+from .validation import STAFF_PER_DAY
+
+DEFAULT_BUDGET_MS = 200
+
+# Cost of each missing member, committee member or gender on a day, in
+# units of the fairness term (sum of squared loads)
+HARD_PENALTY = 1000
+
+# Starting temperature of the annealing schedule; cools linearly to zero
+START_TEMPERATURE = 2.0
+
+# Number of moves between clock checks
+CHECK_EVERY = 256
+
+
+def _day_penalty(staff: int, committee: int, male: int, female: int) -> int:
+    return abs(STAFF_PER_DAY - staff) + (committee == 0) + (male == 0) + (female == 0)
+
+
+def solve_heuristic(
+    members: Sequence,
+    days: Sequence[date],
+    budget_ms: int = DEFAULT_BUDGET_MS,
+    fixed: Optional[Mapping[date, Sequence[int]]] = None,
+    seed: Optional[int] = None,
+) -> Dict[str, object]:
+    """Build a schedule heuristically and improve its fairness.
+
+    Parameters
+    ----------
+    members: Sequence
+        Members to schedule, as ``scheduler.Member``.
+    days: Sequence[date]
+        Days to staff, in ascending order.
+    budget_ms: int
+        Time budget in milliseconds, including the constructive pass.
+    fixed: Optional[Mapping[date, Sequence[int]]]
+        Member ids to keep on some days, as in ``scheduler.solve_schedule``.
+        They count towards the members' load.
+    seed: Optional[int]
+        Seed for reproducible runs.
+
+    Returns
+    -------
+    Dict[str, object]
+        Result in the format of ``scheduler.solve_schedule``. ``solver``
+        reports the fairness objective and the number of moves tried.
+    """
+    started = time.perf_counter()
+    deadline = started + budget_ms / 1000
+    rng = random.Random(seed)
+
+    members = list(members)
+    fixed = fixed or {}
+    days = [d for d in days if d not in fixed]
+    n_members, n_days = len(members), len(days)
+    member_pos = {m.id: i for i, m in enumerate(members)}
+    day_pos = {d: j for j, d in enumerate(days)}
+    one_day = timedelta(days=1)
+
+    index = AvailabilityIndex.from_members(members, days)
+    available = np.zeros((n_members, n_days), dtype=bool)
+    for j, d in enumerate(days):
+        available[list(iter_bits(index.date_mask(d))), j] = True
+
+    load = [0] * n_members
+    for d, staff in fixed.items():
+        for member_id in staff:
+            i = member_pos.get(member_id)
+            if i is None:
+                continue
+            load[i] += 1
+            # Members kept on a fixed day cannot work its neighbours
+            for neighbour in (d - one_day, d + one_day):
+                if neighbour in day_pos:
+                    available[i, day_pos[neighbour]] = False
+
+    prev_day = [j - 1 if j and days[j - 1] == days[j] - one_day else -1 for j in range(n_days)]
+    next_day = [
+        j + 1 if j + 1 < n_days and days[j + 1] == days[j] + one_day else -1
+        for j in range(n_days)
+    ]
+    committee, male, female = (v.tolist() for v in validation.attribute_vectors(members))
+    candidates = [np.flatnonzero(available[:, j]).tolist() for j in range(n_days)]
+
+    # Constructive pass: cover the committee and gender rules with the least
+    # loaded free members, then fill the day up to four
+    assigned = np.zeros((n_members, n_days), dtype=bool)
+    day_staff: List[List[int]] = []
+    for j in range(n_days):
+        free = [
+            i for i in candidates[j] if prev_day[j] < 0 or not assigned[i, prev_day[j]]
+        ]
+        rng.shuffle(free)
+        free.sort(key=load.__getitem__)
+        chosen: List[int] = []
+        for need in (committee, female, male):
+            if not any(need[i] for i in chosen):
+                pick = next((i for i in free if need[i]), None)
+                if pick is not None:
+                    chosen.append(pick)
+                    free.remove(pick)
+        chosen.extend(free[: STAFF_PER_DAY - len(chosen)])
+        for i in chosen:
+            assigned[i, j] = True
+            load[i] += 1
+        day_staff.append(chosen)
+
+    staff_count = [len(staff) for staff in day_staff]
+    committee_count = [sum(committee[i] for i in staff) for staff in day_staff]
+    male_count = [sum(male[i] for i in staff) for staff in day_staff]
+    female_count = [sum(female[i] for i in staff) for staff in day_staff]
+    penalty = sum(
+        _day_penalty(staff_count[j], committee_count[j], male_count[j], female_count[j])
+        for j in range(n_days)
+    )
+    fairness = sum(value * value for value in load)
+    score = HARD_PENALTY * penalty + fairness
+    best, best_score = assigned.copy(), score
+
+    # Simulated annealing over replace and add moves
+    iterations = 0
+    temperature = START_TEMPERATURE
+    while n_days:
+        if iterations % CHECK_EVERY == 0:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            temperature = START_TEMPERATURE * (deadline - now) / (deadline - started)
+            if score < best_score:
+                best, best_score = assigned.copy(), score
+        iterations += 1
+
+        j = rng.randrange(n_days)
+        if not candidates[j]:
+            continue
+        b = rng.choice(candidates[j])
+        if (
+            assigned[b, j]
+            or (prev_day[j] >= 0 and assigned[b, prev_day[j]])
+            or (next_day[j] >= 0 and assigned[b, next_day[j]])
+        ):
+            continue
+
+        staff = day_staff[j]
+        a = None if staff_count[j] < STAFF_PER_DAY else rng.choice(staff)
+        s, c, m, f = staff_count[j], committee_count[j], male_count[j], female_count[j]
+        if a is None:
+            new = (s + 1, c + committee[b], m + male[b], f + female[b])
+            delta_fairness = 2 * load[b] + 1
+        else:
+            new = (
+                s,
+                c - committee[a] + committee[b],
+                m - male[a] + male[b],
+                f - female[a] + female[b],
+            )
+            delta_fairness = 2 * (load[b] - load[a]) + 2
+        delta_penalty = _day_penalty(*new) - _day_penalty(s, c, m, f)
+        delta = HARD_PENALTY * delta_penalty + delta_fairness
+        if delta > 0 and (
+            temperature <= 0 or rng.random() >= math.exp(-delta / temperature)
+        ):
+            continue
+
+        if a is not None:
+            assigned[a, j] = False
+            load[a] -= 1
+            staff.remove(a)
+        assigned[b, j] = True
+        load[b] += 1
+        staff.append(b)
+        staff_count[j], committee_count[j], male_count[j], female_count[j] = new
+        score += delta
+
+    if score < best_score:
+        best, best_score = assigned, score
+
+    member_ids = np.fromiter((m.id for m in members), dtype=np.int64, count=n_members)
+    assignments: Dict[date, List[int]] = {d: list(staff) for d, staff in fixed.items()}
+    for j, d in enumerate(days):
+        assignments[d] = member_ids[best[:, j]].tolist()
+
+    loads = best.sum(axis=1)
+    for staff in fixed.values():
+        for member_id in staff:
+            if member_id in member_pos:
+                loads[member_pos[member_id]] += 1
+    violated_constraints = validation.find_violations(members, days, best)
+    status = solvers.NOT_SOLVED if violated_constraints else solvers.FEASIBLE
+    metrics.inc("shift_solver_runs_total", backend="heuristic", status=status)
+    return {
+        "assignments": assignments,
+        "unassigned_members": member_ids[loads == 0].tolist(),
+        "violated_constraints": violated_constraints,
+        "solver": {
+            "backend": "heuristic",
+            "status": status,
+            "objective": int((loads * loads).sum()),
+            "iterations": iterations,
+            "time": round(time.perf_counter() - started, 4),
+        },
+    }
@@ -0,0 +1,154 @@
+"""Background jobs executed in a process pool.
+
+Schedule generation can keep CBC busy for tens of seconds, so long-running
+work is submitted here instead of being run inside the request handler.
+Jobs are tracked in memory by id; their results are kept until the job
+table grows past ``MAX_JOBS`` entries.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+# Number of worker processes and per-job timeout in seconds
+JOB_WORKERS = int(os.getenv("SHIFT_JOB_WORKERS", "2"))
+JOB_TIMEOUT = float(os.getenv("SHIFT_JOB_TIMEOUT", "120"))
+MAX_JOBS = 100
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+TIMEOUT = "timeout"
+
+
+@dataclass
+class Job:
+    """State of a submitted job."""
+
+    id: str
+    timeout: float
+    status: str = PENDING
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    future: Optional[Future] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED, TIMEOUT)
+
+
+class JobManager:
+    """Run callables in a ``ProcessPoolExecutor`` and track their state.
+
+    Parameters
+    ----------
+    max_workers: int
+        Size of the process pool.
+    timeout: float
+        Seconds a job may run before it is reported as timed out. The clock
+        starts when :meth:`get` first sees the pool hand the job to its
+        workers, so time spent queued behind other jobs does not count. A running worker cannot be
+        interrupted, so callers should also bound the work itself (e.g.
+        with a solver time limit); a result that still arrives after the
+        timeout replaces the timeout.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, timeout: float = JOB_TIMEOUT) -> None:
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned workers do not inherit the server's threads or open
+            # database connections.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        on_result: Optional[Callable[[Any], Any]] = None,
+    ) -> Job:
+        """Submit ``fn(*args)`` to the pool and return the new job.
+
+        ``fn`` and its arguments must be picklable. ``on_result`` runs in
+        this process with the worker's return value, and its return value is
+        stored as the job result, even if the job has timed out meanwhile.
+        """
+        job = Job(id=uuid.uuid4().hex, timeout=self.timeout)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > MAX_JOBS:
+                oldest = next(iter(self._jobs.values()))
+                if not oldest.finished:
+                    break
+                self._jobs.popitem(last=False)
+
+        job.future = self._get_executor().submit(fn, *args)
+        job.future.add_done_callback(lambda future: self._finish(job, future, on_result))
+        return job
+
+    def _finish(
+        self,
+        job: Job,
+        future: Future,
+        on_result: Optional[Callable[[Any], Any]],
+    ) -> None:
+        if future.cancelled():
+            return
+        try:
+            result = future.result()
+            if on_result is not None:
+                result = on_result(result)
+        except Exception as e:
+            status, result, error = FAILED, None, f"{type(e).__name__}: {e}"
+        else:
+            status, error = DONE, None
+        with self._lock:
+            # A late result replaces the timeout, so a finished schedule is
+            # never lost
+            job.status, job.result, job.error = status, result, error
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return the job with ``job_id``, marking it timed out if overdue."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            now = time.time()
+            if job.started_at is None and job.future is not None and job.future.running():
+                job.started_at = now
+                job.status = RUNNING
+            if job.started_at is not None and now - job.started_at > job.timeout:
+                job.status = TIMEOUT
+                job.error = f"Job did not finish within {job.timeout:g} seconds"
+                job.finished_at = now
+            return job
+
+    def shutdown(self) -> None:
+        """Stop the worker processes without waiting for running jobs."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+job_manager = JobManager()
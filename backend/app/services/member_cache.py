@@ -0,0 +1,101 @@
+"""Name to member lookups shared by the upload endpoints.
+
+A :class:`MemberCache` loads every member with one query the first time it
+is asked for them. By default each request gets its own cache, through the
+:func:`get_member_cache` dependency. With ``MEMBER_CACHE=process`` one cache
+is shared by all requests of the process. Its entries are updated in place
+when members are created or deleted, and it is reloaded after writes whose
+results are not known, such as a CSV upload on a database without
+``RETURNING``.
+
+Every write bumps a module-wide version; a cache whose version is behind
+reloads on next use. Writes made by other processes are not seen, so use
+the process scope only with a single worker process.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.member import Member
+
+SCOPE = os.getenv("MEMBER_CACHE", "request").lower()
+
+
+@dataclass(frozen=True)
+class MemberInfo:
+    id: int
+    gender: str
+    is_committee: bool
+
+
+# Bumped on every member write
+_version = 0
+
+
+def _bump() -> int:
+    global _version
+    _version += 1
+    return _version
+
+
+class MemberCache:
+    """Member attributes by name, loaded with a single query on first use."""
+
+    def __init__(self) -> None:
+        self._members: Optional[Dict[str, MemberInfo]] = None
+        self._version = -1
+
+    async def members(self, db: AsyncSession) -> Dict[str, MemberInfo]:
+        """Return all members by name, loading them if the cache is stale."""
+        if self._members is None or self._version != _version:
+            version = _version
+            rows = await db.execute(
+                select(Member.name, Member.id, Member.gender, Member.is_committee)
+            )
+            self._members = {
+                name: MemberInfo(member_id, gender, is_committee)
+                for name, member_id, gender, is_committee in rows
+            }
+            # A write made while loading leaves the cache behind, so it
+            # is loaded again on next use
+            self._version = version
+        return self._members
+
+    async def ids(self, db: AsyncSession, names: Iterable[str]) -> Dict[str, int]:
+        """Return the ids of the members of ``names`` that exist."""
+        members = await self.members(db)
+        return {name: members[name].id for name in names if name in members}
+
+    def put(self, name: str, info: MemberInfo) -> None:
+        """Record a created or updated member."""
+        self._apply(lambda members: members.__setitem__(name, info))
+
+    def remove(self, name: str) -> None:
+        """Forget a deleted member."""
+        self._apply(lambda members: members.pop(name, None))
+
+    def invalidate(self) -> None:
+        """Reload the members on next use."""
+        _bump()
+
+    def _apply(self, change) -> None:
+        current = self._version == _version
+        version = _bump()
+        if self._members is not None and current:
+            change(self._members)
+            self._version = version
+
+
+_process_cache = MemberCache()
+
+
+def get_member_cache() -> MemberCache:
+    """FastAPI dependency returning the cache for the configured scope."""
+    if SCOPE == "process":
+        return _process_cache
+    return MemberCache()
@@ -0,0 +1,188 @@
+"""Stage timers and counters for the hot paths.
+
+Metrics are collected only when the ``SHIFT_METRICS`` environment variable
+is set to ``1``. When it is off, :func:`stage` returns a shared no-op
+context manager and the other helpers return immediately, so the
+instrumented code pays for one flag check.
+
+Collected values are served in the Prometheus text format at ``/metrics``.
+The stage times of the current request are also returned in a
+``Server-Timing`` header by :class:`ServerTimingMiddleware`. Values are
+kept per process; work done in job or batch worker processes is not
+included.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import ContextManager, Dict, List, Optional, Tuple
+
+ENABLED = os.getenv("SHIFT_METRICS", "").lower() in ("1", "true", "yes")
+
+# Name -> (Prometheus type, help text)
+METRICS: Dict[str, Tuple[str, str]] = {
+    "shift_stage_seconds": ("summary", "Time spent in each processing stage"),
+    "shift_http_request_seconds": ("summary", "HTTP request duration"),
+    "shift_generations_total": ("counter", "Schedules generated, by engine"),
+    "shift_solver_runs_total": ("counter", "Solver runs, by backend and status"),
+    "shift_model_variables": ("gauge", "Decision variables of the last ILP model"),
+    "shift_model_constraints": ("gauge", "Constraints of the last ILP model"),
+    "shift_upload_rows_total": ("counter", "Rows written by CSV uploads"),
+    "shift_upload_errors_total": ("counter", "Rejected cells or rows in CSV uploads"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_values: Dict[Tuple[str, Labels], float] = {}
+_summaries: Dict[Tuple[str, Labels], List[float]] = {}
+
+# Stage durations of the request being handled, summed per stage name
+_request_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "shift_request_stages", default=None
+)
+
+_NULL_STAGE = nullcontext()
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def observe(metric: str, seconds: float, **labels: object) -> None:
+    """Add one observation to a summary metric."""
+    if not ENABLED:
+        return
+    key = (metric, _labels(labels))
+    with _lock:
+        summary = _summaries.setdefault(key, [0, 0.0])
+        summary[0] += 1
+        summary[1] += seconds
+
+
+def inc(metric: str, value: float = 1, **labels: object) -> None:
+    """Increase a counter metric."""
+    if not ENABLED:
+        return
+    key = (metric, _labels(labels))
+    with _lock:
+        _values[key] = _values.get(key, 0) + value
+
+
+def set_gauge(metric: str, value: float, **labels: object) -> None:
+    """Set a gauge metric."""
+    if not ENABLED:
+        return
+    with _lock:
+        _values[(metric, _labels(labels))] = value
+
+
+class _Stage:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> "_Stage":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        elapsed = time.perf_counter() - self.started
+        observe("shift_stage_seconds", elapsed, stage=self.name)
+        timings = _request_stages.get()
+        if timings is not None:
+            timings[self.name] = timings.get(self.name, 0.0) + elapsed
+
+
+def stage(name: str) -> ContextManager:
+    """Time the enclosed block as stage ``name``.
+
+    Repeated stages within a request, such as batch inserts, are summed in
+    the ``Server-Timing`` header.
+    """
+    if not ENABLED:
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render() -> str:
+    """Return all metrics in the Prometheus text exposition format."""
+    with _lock:
+        values = dict(_values)
+        summaries = {key: list(value) for key, value in _summaries.items()}
+
+    def series(name: str, labels: Labels, value: float) -> str:
+        label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels)
+        return f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}"
+
+    lines: List[str] = []
+    for metric, (kind, help_text) in METRICS.items():
+        if kind == "summary":
+            samples = sorted((labels, v) for (name, labels), v in summaries.items() if name == metric)
+        else:
+            samples = sorted((labels, v) for (name, labels), v in values.items() if name == metric)
+        if not samples:
+            continue
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for labels, value in samples:
+            if kind == "summary":
+                lines.append(series(f"{metric}_count", labels, value[0]))
+                lines.append(series(f"{metric}_sum", labels, value[1]))
+            else:
+                lines.append(series(metric, labels, value))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def reset() -> None:
+    """Drop all collected values."""
+    with _lock:
+        _values.clear()
+        _summaries.clear()
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    """Format stage durations in seconds as a ``Server-Timing`` header value."""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding a ``Server-Timing`` header with the request's stages.
+
+    Also records the request duration per route. Does nothing while
+    metrics are disabled.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, float] = {}
+        token = _request_stages.set(timings)
+        started = time.perf_counter()
+
+        async def send_with_timing(message) -> None:
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - started
+                route = getattr(scope.get("route"), "path", "unmatched")
+                observe("shift_http_request_seconds", total, method=scope["method"], route=route)
+                header = server_timing({**timings, "total": total})
+                message["headers"] = [*message.get("headers", []), (b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stages.reset(token)
@@ -0,0 +1,152 @@
+"""Presolve reductions for the scheduling ILP.
+
+Two reductions shrink the model before it reaches the solver:
+
+* Days with at most four available members, none of whom is available
+  on a neighbouring day, are taken out and all of those members assigned.
+  Each of them lowers the day's shortage, whose penalty outweighs any
+  fairness gain, and blocks no other day, so every optimal schedule
+  contains them. Short days with members shared with a neighbour stay in
+  the model, where their shortage is weighed against the neighbours'.
+* Members with the same gender, committee flag, available days, prior load
+  and weight are interchangeable. They are grouped into classes and the
+  model only decides how many members of each class work each day, which
+  removes the symmetry between them. :func:`expand` turns these counts
+  back into individual members.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Mapping, Sequence, Set, Tuple
+
+from .availability_index import AvailabilityIndex, iter_bits
+from .validation import STAFF_PER_DAY
+
+ONE_DAY = timedelta(days=1)
+
+
+@dataclass
+class Presolved:
+    """Outcome of :func:`reduce_days`; members are given by position."""
+
+    days: List[date]
+    available: Dict[date, Set[int]]
+    forced: Dict[date, List[int]] = field(default_factory=dict)
+    unstaffable: List[date] = field(default_factory=list)  # fewer than four available
+
+
+@dataclass
+class MemberClass:
+    """Interchangeable members (by position) and the model days they can work."""
+
+    positions: List[int]
+    days: List[date]
+    gender: str
+    is_committee: bool
+
+
+def reduce_days(
+    members: Sequence,
+    days: Sequence[date],
+    fixed: Mapping[date, Sequence[int]],
+) -> Presolved:
+    """Take the days whose staff is forced out of the model.
+
+    Parameters
+    ----------
+    members: Sequence
+        Members to schedule, as ``scheduler.Member``.
+    days: Sequence[date]
+        Days to staff, without the ``fixed`` ones.
+    fixed: Mapping[date, Sequence[int]]
+        Member ids kept on other days; they cannot work the neighbouring
+        days.
+
+    Returns
+    -------
+    Presolved
+        The days left for the model, the members available on every day,
+        the forced assignments and the days that cannot be fully staffed,
+        whether forced or not.
+    """
+    member_pos = {m.id: i for i, m in enumerate(members)}
+    index = AvailabilityIndex.from_members(members, days)
+    available = {d: set(iter_bits(index.date_mask(d))) for d in days}
+
+    # Members kept on a neighbouring fixed day cannot work
+    for d, staff in fixed.items():
+        positions = {member_pos[member_id] for member_id in staff if member_id in member_pos}
+        for neighbour in (d - ONE_DAY, d + ONE_DAY):
+            if neighbour in available:
+                available[neighbour] -= positions
+
+    forced: Dict[date, List[int]] = {}
+    unstaffable: List[date] = []
+    for d in days:
+        pool = available[d]
+        if len(pool) > STAFF_PER_DAY:
+            continue
+        if len(pool) < STAFF_PER_DAY:
+            unstaffable.append(d)
+        neighbours = available.get(d - ONE_DAY, set()) | available.get(d + ONE_DAY, set())
+        if not pool & neighbours:
+            forced[d] = sorted(pool)
+
+    remaining = [d for d in days if d not in forced]
+    return Presolved(remaining, available, forced, unstaffable)
+
+
+def member_classes(
+    members: Sequence,
+    presolved: Presolved,
+    base_load: Sequence[int],
+    weights: Sequence[float],
+) -> List[MemberClass]:
+    """Group the members available on some model day into equivalence classes.
+
+    ``base_load`` (shifts already given on fixed or forced days) and
+    ``weights`` are indexed by member position, like ``members``.
+    """
+    days_of: Dict[int, List[date]] = {}
+    for d in presolved.days:
+        for i in presolved.available[d]:
+            days_of.setdefault(i, []).append(d)
+
+    groups: Dict[Tuple, List[int]] = {}
+    for i in sorted(days_of):
+        m = members[i]
+        key = (m.gender, bool(m.is_committee), tuple(days_of[i]), base_load[i], weights[i])
+        groups.setdefault(key, []).append(i)
+    return [
+        MemberClass(positions, list(key[2]), gender=key[0], is_committee=key[1])
+        for key, positions in groups.items()
+    ]
+
+
+def expand(
+    classes: Sequence[MemberClass],
+    counts: Mapping[Tuple[int, date], int],
+    days: Sequence[date],
+    working: Dict[date, Set[int]],
+    load: List[int],
+) -> None:
+    """Turn per-class counts into members, day by day.
+
+    Each class sends its least loaded members who did not work the day
+    before. The model limits two adjacent days of a class to the class
+    size, so enough such members always exist. ``working`` (member
+    positions per staffed day) and ``load`` are updated in place.
+    """
+    for d in sorted(days):
+        staff = working.setdefault(d, set())
+        previous = working.get(d - ONE_DAY, ())
+        for k, member_class in enumerate(classes):
+            count = counts.get((k, d), 0)
+            if not count:
+                continue
+            free = [i for i in member_class.positions if i not in previous]
+            free.sort(key=load.__getitem__)
+            for i in free[:count]:
+                staff.add(i)
+                load[i] += 1
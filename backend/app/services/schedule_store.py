@@ -0,0 +1,154 @@
+"""Persistence of generated schedules.
+
+Every generated schedule is written to ``schedules/<id>.json`` under the
+data directory and also becomes ``latest_schedule.json``. Files are written
+to a temporary file first and then renamed into place, so readers never see
+a partially written schedule. Only the newest ``HISTORY_LIMIT`` schedules
+are kept.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None  # type: ignore
+
+DATA_DIR = Path(
+    os.getenv("SCHEDULE_DATA_DIR", Path(__file__).resolve().parents[2] / "data")
+)
+LATEST_FILE = DATA_DIR / "latest_schedule.json"
+HISTORY_DIR = DATA_DIR / "schedules"
+HISTORY_LIMIT = int(os.getenv("SCHEDULE_HISTORY_LIMIT", "20"))
+
+# Serialized latest schedule, keyed on (generation, mtime, size) of LATEST_FILE
+_cache_lock = threading.Lock()
+_cache_key: Optional[Tuple[int, int, int]] = None
+_cache_body = b"{}"
+_cache_etag = ""
+_generation = 0
+
+
+def dumps(data: dict) -> bytes:
+    """Serialize ``data`` as compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _write_temp(directory: Path, body: bytes) -> Path:
+    """Write ``body`` to a new temporary file in ``directory`` and return its path."""
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    return Path(tmp_name)
+
+
+def _history_path(schedule_id: int) -> Path:
+    return HISTORY_DIR / f"{schedule_id}.json"
+
+
+def list_schedule_ids() -> List[int]:
+    """Return the ids of the stored schedules, newest first."""
+    if not HISTORY_DIR.exists():
+        return []
+    ids = [int(path.stem) for path in HISTORY_DIR.glob("*.json") if path.stem.isdigit()]
+    return sorted(ids, reverse=True)
+
+
+def save_schedule(data: dict) -> int:
+    """Store ``data`` as a new schedule and make it the latest one.
+
+    The new id is added to ``data`` under ``"id"``. Ids are claimed by
+    hard-linking the written file to its final name, which fails if another
+    process took the same id first.
+
+    Returns
+    -------
+    int
+        Id of the stored schedule.
+    """
+    global _generation
+    ids = list_schedule_ids()
+    schedule_id = ids[0] + 1 if ids else 1
+    while True:
+        data["id"] = schedule_id
+        tmp_path = _write_temp(HISTORY_DIR, dumps(data))
+        try:
+            os.link(tmp_path, _history_path(schedule_id))
+        except FileExistsError:
+            schedule_id += 1
+            continue
+        finally:
+            os.unlink(tmp_path)
+        break
+
+    os.replace(_write_temp(DATA_DIR, dumps(data)), LATEST_FILE)
+    with _cache_lock:
+        _generation += 1
+
+    for old_id in list_schedule_ids()[HISTORY_LIMIT:]:
+        try:
+            _history_path(old_id).unlink()
+        except FileNotFoundError:
+            pass
+    return schedule_id
+
+
+def load_schedule_bytes(schedule_id: int) -> Optional[bytes]:
+    """Return the stored JSON of a schedule, or None if it does not exist."""
+    try:
+        return _history_path(schedule_id).read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def load_latest_schedule() -> dict:
+    """Load the latest schedule, or an empty dictionary if none exists."""
+    return json.loads(latest_schedule_payload()[0])
+
+
+def latest_schedule_payload() -> Tuple[bytes, str]:
+    """Return the latest schedule as JSON bytes and its ETag.
+
+    The file is only re-read when its modification time or size changes,
+    or after a schedule is saved by this process.
+    """
+    global _cache_key, _cache_body, _cache_etag
+    try:
+        stat = LATEST_FILE.stat()
+        key = (_generation, stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        key = (_generation, 0, -1)
+
+    with _cache_lock:
+        if key == _cache_key:
+            return _cache_body, _cache_etag
+
+    try:
+        body = LATEST_FILE.read_bytes()
+    except FileNotFoundError:
+        body = b"{}"
+    etag = make_etag(body)
+    with _cache_lock:
+        _cache_key, _cache_body, _cache_etag = key, body, etag
+    return body, etag
+
+
+def make_etag(body: bytes) -> str:
+    """Return a strong ETag for ``body``."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
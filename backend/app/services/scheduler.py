@@ -2,14 +2,30 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from datetime import date, timedelta
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Mapping, Optional, Sequence, Set, Tuple
 import calendar
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models.availability import Availability
+from ..models.member import Member as MemberModel
+from . import metrics, presolve, solvers, validation
+from .availability_index import AvailabilityIndex
+from .solvers import SolverOptions
 
 try:
     import pulp
 except Exception as exc:  # pragma: no cover - dependency resolution handled at runtime
     pulp = None  # type: ignore
 
+# Ways to balance the members' loads in the ILP objective
+FAIRNESS_MODES = ("deviation", "spread")
+
 
 @dataclass
 class Member:
@@ -26,14 +42,55 @@ class Member:
         return not self.preferred_days or day in self.preferred_days
 
 
-def get_members_with_preferences(month: date) -> List[Member]:
-    """Retrieve members and their preferred working days.
+def get_members_with_preferences(
+    db: Session,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> List[Member]:
+    """Retrieve members and their available days from the database.
+
+    Members and availabilities are loaded with a single joined query. Only
+    members with at least one available day between ``start`` and ``end``
+    (inclusive, both optional) are returned, since a member without any
+    availability rows cannot be scheduled.
+
+    Parameters
+    ----------
+    db: Session
+        Open database session.
+    start, end: Optional[date]
+        Bounds of the scheduling window.
 
-    This function is a stub meant to be replaced with actual data access logic.
-    It should return members with their attributes and preferred days within the
-    supplied month.
+    Returns
+    -------
+    List[Member]
+        Members ordered by id with ``preferred_days`` populated.
     """
-    raise NotImplementedError("Data retrieval not implemented")
+    query = (
+        db.query(
+            MemberModel.id,
+            MemberModel.name,
+            MemberModel.gender,
+            MemberModel.is_committee,
+            Availability.date,
+        )
+        .join(Availability, Availability.member_id == MemberModel.id)
+        .order_by(MemberModel.id)
+    )
+    if start is not None:
+        query = query.filter(Availability.date >= start)
+    if end is not None:
+        query = query.filter(Availability.date <= end)
+
+    members: Dict[int, Member] = {}
+    for member_id, name, gender, is_committee, day in query:
+        member = members.get(member_id)
+        if member is None:
+            member = members[member_id] = Member(
+                id=member_id, name=name, gender=gender, is_committee=is_committee
+            )
+        member.preferred_days.add(day)
+    return list(members.values())
 
 
 def _days_in_month(month: date) -> List[date]:
@@ -42,113 +99,479 @@ def _days_in_month(month: date) -> List[date]:
     return [date(month.year, month.month, day) for day in range(1, last_day + 1)]
 
 
-def generate_schedule(month: date) -> Dict[str, object]:
+def generate_schedule(
+    month: date,
+    db: Session,
+    options: Optional[SolverOptions] = None,
+) -> Dict[str, object]:
     """Generate an optimized shift schedule for the given month.
 
+    Parameters
+    ----------
+    month: date
+        Any date within the target month. Usually the first day of the month is
+        supplied.
+    db: Session
+        Database session used to load members and their availability.
+    options: Optional[SolverOptions]
+        Solver backend and limits.
+
+    Returns
+    -------
+    Dict[str, object]
+        See :func:`solve_schedule`.
+    """
+    days = _days_in_month(month)
+    with metrics.stage("db_load"):
+        members = get_members_with_preferences(db, days[0], days[-1])
+    return solve_schedule(members, days, options=options)
+
+
+def target_loads(capacity: np.ndarray, weights: np.ndarray, total: float) -> np.ndarray:
+    """Split ``total`` shifts among members in proportion to ``weights``.
+
+    No member gets more than its ``capacity`` (number of available days);
+    what capped members cannot take is shared among the others.
+    """
+    targets = np.zeros(len(capacity))
+    active = (capacity > 0) & (weights > 0)
+    remaining = min(total, capacity[active].sum())
+    while active.any() and remaining > 0:
+        positions = np.flatnonzero(active)
+        share = remaining * weights[positions] / weights[positions].sum()
+        capped = positions[share >= capacity[positions]]
+        if not len(capped):
+            targets[positions] = share
+            break
+        targets[capped] = capacity[capped]
+        remaining -= capacity[capped].sum()
+        active[capped] = False
+    return targets
+
+
+def _fairness_objective(
+    problem,
+    days: Sequence[date],
+    classes: Sequence[presolve.MemberClass],
+    y: Mapping[Tuple[int, date], object],
+    base_load: Sequence[int],
+    fairness: str,
+    weights: Sequence[float],
+) -> object:
+    """Return an objective that balances each member's load around a target.
+
+    Targets come from :func:`target_loads`. Loads between the floor and
+    ceiling of the target cost nothing. With ``deviation``, the excess and
+    shortfall of every member class are summed. With ``spread``, only the
+    largest per-member excess and shortfall are counted. The auxiliary
+    variables enter one constraint per class, so the LP relaxation stays
+    tight. The objective never exceeds twice the total number of shifts.
+    """
+    if fairness not in FAIRNESS_MODES:
+        raise ValueError(f"Unknown fairness mode '{fairness}'")
+    capacity = np.array(base_load, dtype=float)
+    for member_class in classes:
+        capacity[member_class.positions] += len(member_class.days)
+    total = validation.STAFF_PER_DAY * len(days) + sum(base_load)
+    targets = target_loads(capacity, np.asarray(weights, dtype=float), total)
+
+    if fairness == "spread":
+        excess = pulp.LpVariable("max_excess", 0, len(days), cat="Integer")
+        shortfall = pulp.LpVariable("max_shortfall", 0, len(days), cat="Integer")
+    terms = []
+    for k, member_class in enumerate(classes):
+        size = len(member_class.positions)
+        first = member_class.positions[0]
+        # Members of a class share their target and are spread evenly by
+        # presolve.expand, so the class load is compared to size x target
+        load = pulp.lpSum(y[(k, d)] for d in member_class.days) + size * base_load[first]
+        low, high = math.floor(targets[first]), math.ceil(targets[first])
+        if fairness == "spread":
+            over, under = size * excess, size * shortfall
+        else:
+            over = pulp.LpVariable(f"over_{k}", 0, size * len(member_class.days), cat="Integer")
+            under = pulp.LpVariable(f"under_{k}", 0, size * low, cat="Integer")
+            terms += [over, under]
+        problem += (load - over <= size * high, f"fair_over_{k}")
+        problem += (load + under >= size * low, f"fair_under_{k}")
+    if fairness == "spread":
+        terms = [excess, shortfall]
+    return pulp.lpSum(terms)
+
+
+def solve_schedule(
+    members: Sequence[Member],
+    days: Sequence[date],
+    options: Optional[SolverOptions] = None,
+    fixed: Optional[Mapping[date, Sequence[int]]] = None,
+    warm_start: Optional[Mapping[date, Sequence[int]]] = None,
+    fairness: str = "deviation",
+    weights: Optional[Mapping[int, float]] = None,
+) -> Dict[str, object]:
+    """Solve the shift schedule ILP for the given members and days.
+
     The schedule follows several constraints:
     * Exactly four members per day.
     * At least one promotion committee member per day.
     * At least one male and one female per day.
     * No member works two consecutive days.
 
+    The staffing rules are soft: each day may fall short of them at a
+    penalty that outweighs any gain in fairness, so a schedule is returned
+    even when the rules cannot all be met, and the rules it breaks are
+    listed. Only the consecutive-day rule is hard.
+
+    Days whose staff is forced are taken out and interchangeable members
+    are grouped by ``presolve`` first; the model then decides how many
+    members of each class work each day, only on days the class is
+    available. The objective spreads the shifts evenly, see
+    :func:`_fairness_objective`.
+
     Parameters
     ----------
-    month: date
-        Any date within the target month. Usually the first day of the month is
-        supplied.
+    members: Sequence[Member]
+        Members to schedule.
+    days: Sequence[date]
+        Days to staff, in ascending order. Days need not be contiguous; the
+        consecutive-day rule applies to calendar neighbours only.
+    options: Optional[SolverOptions]
+        Solver backend and limits; CBC without limits by default.
+    fixed: Optional[Mapping[date, Sequence[int]]]
+        Member ids to keep on some days. These days are left out of the
+        model and only constrain their calendar neighbours through the
+        consecutive-day rule.
+    warm_start: Optional[Mapping[date, Sequence[int]]]
+        Member ids previously assigned to the days being solved, passed to
+        the solver as the initial solution.
+    fairness: str
+        ``deviation`` (default) minimizes the total distance of the loads
+        from their targets; ``spread`` minimizes the largest excess plus the
+        largest shortfall.
+    weights: Optional[Mapping[int, float]]
+        Relative share of shifts per member id; 1.0 if not given.
 
     Returns
     -------
     Dict[str, object]
         A dictionary containing the generated assignments, members that could
-        not be assigned, and any violated constraints.
+        not be assigned, any violated constraints, and the solver outcome
+        (see :func:`solvers.solve`). When the solver stops at a limit, the
+        best feasible schedule found is returned and its gap is reported
+        under ``solver``.
     """
-    members = get_members_with_preferences(month)
     if pulp is None:
         raise RuntimeError("pulp library is required for schedule generation")
 
-    days = _days_in_month(month)
-    problem = pulp.LpProblem("shift_schedule", pulp.LpMinimize)
+    members = list(members)
+    fixed = fixed or {}
+    warm_start = warm_start or {}
+    weights = weights or {}
+    days = [d for d in days if d not in fixed]
+    member_pos = {m.id: i for i, m in enumerate(members)}
 
-    # Decision variables: x[(member_id, day)] is 1 if member works on day
-    x: Dict[Tuple[int, date], pulp.LpVariable] = {
-        (m.id, d): pulp.LpVariable(f"x_{m.id}_{d.day}", cat="Binary")
-        for m in members
-        for d in days
-    }
+    with metrics.stage("presolve"):
+        reduced = presolve.reduce_days(members, days, fixed)
+        base_load = [0] * len(members)
+        for staff in fixed.values():
+            for member_id in staff:
+                if member_id in member_pos:
+                    base_load[member_pos[member_id]] += 1
+        for staff in reduced.forced.values():
+            for i in staff:
+                base_load[i] += 1
+        weight = [weights.get(m.id, 1.0) for m in members]
+        classes = presolve.member_classes(members, reduced, base_load, weight)
 
-    # Objective: minimise total assignments (constant) to form a valid problem
-    problem += pulp.lpSum(x.values())
+    with metrics.stage("model_build"):
+        problem = pulp.LpProblem("shift_schedule", pulp.LpMinimize)
 
-    # Constraint: each day has exactly 4 members
-    for d in days:
-        problem += (
-            pulp.lpSum(x[(m.id, d)] for m in members) == 4,
-            f"staff_count_{d.day}",
+        # Decision variables: y[(k, day)] is the number of members of class k
+        # working on day. Only days on which the class is available get one.
+        y: Dict[Tuple[int, date], pulp.LpVariable] = {}
+        classes_by_day: Dict[date, List[int]] = {d: [] for d in reduced.days}
+        for k, member_class in enumerate(classes):
+            size = len(member_class.positions)
+            class_ids = {members[i].id for i in member_class.positions}
+            for d in member_class.days:
+                var = pulp.LpVariable(
+                    f"y_{k}_{d:%Y%m%d}", 0, min(size, validation.STAFF_PER_DAY), cat="Integer"
+                )
+                if warm_start:
+                    var.setInitialValue(len(class_ids.intersection(warm_start.get(d, ()))))
+                y[(k, d)] = var
+                classes_by_day[d].append(k)
+
+        # Objective: balance the members' loads
+        fairness_objective = _fairness_objective(
+            problem, reduced.days, classes, y, base_load, fairness, weight
         )
 
-    # Constraint: at least one committee member per day
+        violated_constraints: List[str] = []
+        shortages: List[pulp.LpVariable] = []
+        for d in reduced.days:
+            candidates = classes_by_day[d]
+            rules = [
+                ("staff_count", candidates),
+                ("committee", [k for k in candidates if classes[k].is_committee]),
+                ("male", [k for k in candidates if classes[k].gender == "M"]),
+                ("female", [k for k in candidates if classes[k].gender == "F"]),
+            ]
+            for rule, pool in rules:
+                if not pool:
+                    # Nobody can satisfy the rule; the solver would silently drop
+                    # an empty constraint, so report it up front.
+                    violated_constraints.append(f"{rule}_day_{d.isoformat()}")
+                    continue
+                expr = pulp.lpSum(y[(k, d)] for k in pool)
+                # Constraint: each day has exactly 4 members; at least one
+                # committee member, one male and one female per day. The
+                # shortage variable takes up what the day cannot meet.
+                if rule == "staff_count":
+                    shortage = pulp.LpVariable(
+                        f"short_{d:%Y%m%d}", 0, validation.STAFF_PER_DAY, cat="Integer"
+                    )
+                    constraint = expr + shortage == validation.STAFF_PER_DAY
+                else:
+                    shortage = pulp.LpVariable(f"missing_{rule}_{d:%Y%m%d}", 0, 1, cat="Integer")
+                    constraint = expr + shortage >= 1
+                problem += (constraint, f"{rule}_{d:%Y%m%d}")
+                shortages.append(shortage)
+
+        # Any shortage costs more than the worst fairness objective
+        penalty = 2 * (validation.STAFF_PER_DAY * len(reduced.days) + sum(base_load)) + 1
+        problem += fairness_objective + penalty * pulp.lpSum(shortages)
+
+        # Constraint: avoid consecutive days for same member. Within a class
+        # this holds if two adjacent days together use at most every member
+        # of the class once; redundant when the class is large enough.
+        for k, member_class in enumerate(classes):
+            size = len(member_class.positions)
+            if 2 * min(size, validation.STAFF_PER_DAY) <= size:
+                continue
+            for d1, d2 in zip(member_class.days[:-1], member_class.days[1:]):
+                if d2 - d1 == timedelta(days=1):
+                    problem += (
+                        y[(k, d1)] + y[(k, d2)] <= size,
+                        f"no_consecutive_{k}_{d1:%Y%m%d}",
+                    )
+
+    metrics.set_gauge("shift_model_variables", len(y))
+    metrics.set_gauge("shift_model_constraints", len(problem.constraints))
+    with metrics.stage("solve"):
+        solver_info = solvers.solve(problem, options, warm_start=bool(warm_start))
+    solved = solver_info["status"] in (solvers.OPTIMAL, solvers.FEASIBLE)
+
+    with metrics.stage("extract"):
+        # Expand the class counts into members around the kept and forced days
+        counts = {key: int(round(var.varValue or 0)) for key, var in y.items()} if solved else {}
+        working = {
+            d: {member_pos[member_id] for member_id in staff if member_id in member_pos}
+            for d, staff in fixed.items()
+        }
+        working.update({d: set(staff) for d, staff in reduced.forced.items()})
+        load = list(base_load)
+        presolve.expand(classes, counts, reduced.days, working, load)
+
+        matrix = np.zeros((len(members), len(days)), dtype=bool)
+        for j, d in enumerate(days):
+            matrix[list(working.get(d, ())), j] = True
+
+        member_ids = np.fromiter((m.id for m in members), dtype=np.int64, count=len(members))
+        assignments: Dict[date, List[int]] = {d: list(staff) for d, staff in fixed.items()}
+        for j, d in enumerate(days):
+            assignments[d] = member_ids[matrix[:, j]].tolist()
+        unassigned_members = member_ids[np.asarray(load) == 0].tolist()
+
+        if solved:
+            violated_constraints = validation.find_violations(members, days, matrix)
+        else:
+            violated_constraints.extend(f"staff_count_day_{d.isoformat()}" for d in reduced.unstaffable)
+            violated_constraints.append("no_feasible_solution")
+
+    return {
+        "assignments": assignments,
+        "unassigned_members": unassigned_members,
+        "violated_constraints": violated_constraints,
+        "solver": solver_info,
+    }
+
+
+def plan_incremental(
+    previous: Mapping[date, Sequence[Optional[int]]],
+    index: AvailabilityIndex,
+    days: Sequence[date],
+) -> Tuple[Dict[date, List[int]], Dict[date, List[int]]]:
+    """Split days into kept and re-solved ones for an incremental run.
+
+    A day needs re-solving when it has no previous assignment, was short of
+    four members, or keeps a member who is unknown (``None``) or no longer
+    available. Its calendar neighbours are re-solved as well, since the
+    consecutive-day rule couples adjacent days.
+
+    Parameters
+    ----------
+    previous: Mapping[date, Sequence[Optional[int]]]
+        Member ids of the previous schedule per day.
+    index: AvailabilityIndex
+        Current availability.
+    days: Sequence[date]
+        Days of the new schedule.
+
+    Returns
+    -------
+    Tuple[Dict[date, List[int]], Dict[date, List[int]]]
+        The assignments to keep (``fixed``) and the previous assignments of
+        the days to re-solve (``warm_start``).
+    """
+    day_set = set(days)
+    dirty: Set[date] = set()
     for d in days:
-        problem += (
-            pulp.lpSum(x[(m.id, d)] for m in members if m.is_committee) >= 1,
-            f"committee_{d.day}",
-        )
+        staff = previous.get(d)
+        if (
+            staff is None
+            or len(staff) < 4
+            or any(member_id is None or not index.is_available(member_id, d) for member_id in staff)
+        ):
+            dirty.add(d)
+
+    one_day = timedelta(days=1)
+    affected = set(dirty)
+    for d in dirty:
+        affected.update(n for n in (d - one_day, d + one_day) if n in day_set)
 
-    # Constraint: gender balance per day
+    fixed = {d: list(previous[d]) for d in days if d not in affected}
+    warm_start = {
+        d: [member_id for member_id in previous.get(d, ()) if member_id is not None]
+        for d in days
+        if d in affected
+    }
+    return fixed, warm_start
+
+
+def split_into_months(days: Sequence[date]) -> List[List[date]]:
+    """Group ascending ``days`` into one window per calendar month."""
+    windows: List[List[date]] = []
     for d in days:
-        problem += (
-            pulp.lpSum(x[(m.id, d)] for m in members if m.gender == "M") >= 1,
-            f"male_{d.day}",
-        )
-        problem += (
-            pulp.lpSum(x[(m.id, d)] for m in members if m.gender == "F") >= 1,
-            f"female_{d.day}",
-        )
+        if windows and (windows[-1][0].year, windows[-1][0].month) == (d.year, d.month):
+            windows[-1].append(d)
+        else:
+            windows.append([d])
+    return windows
 
-    # Constraint: avoid consecutive days for same member
-    for m in members:
-        for d1, d2 in zip(days[:-1], days[1:]):
-            problem += (
-                x[(m.id, d1)] + x[(m.id, d2)] <= 1,
-                f"no_consecutive_{m.id}_{d1.day}",
-            )
 
-    # Constraint: respect member availability
-    for m in members:
-        for d in days:
-            if not m.is_available(d):
-                problem += (
-                    x[(m.id, d)] == 0,
-                    f"availability_{m.id}_{d.day}",
-                )
+def _solve_window(
+    members: Sequence[Member],
+    window: Sequence[date],
+    options: Optional[SolverOptions],
+    fixed: Mapping[date, Sequence[int]],
+    fairness: str = "deviation",
+    weights: Optional[Mapping[int, float]] = None,
+) -> Dict[str, object]:
+    """Solve one month window; runs in a worker process."""
+    window_set = set(window)
+    window_members = [
+        m for m in members if not m.preferred_days or not m.preferred_days.isdisjoint(window_set)
+    ]
+    return solve_schedule(
+        window_members, window, options=options, fixed=fixed, fairness=fairness, weights=weights
+    )
 
-    status = problem.solve(pulp.PULP_CBC_CMD(msg=False))
 
-    assignments: Dict[date, List[int]] = {d: [] for d in days}
-    for m in members:
-        for d in days:
-            if pulp.value(x[(m.id, d)]) == 1:
-                assignments[d].append(m.id)
+def solve_schedule_range(
+    members: Sequence[Member],
+    days: Sequence[date],
+    max_workers: Optional[int] = None,
+    options: Optional[SolverOptions] = None,
+    fairness: str = "deviation",
+    weights: Optional[Mapping[int, float]] = None,
+) -> Dict[str, object]:
+    """Solve a multi-month schedule by solving month windows in parallel.
 
-    unassigned_members = [m.id for m in members if all(pulp.value(x[(m.id, d)]) != 1 for d in days)]
+    Windows are solved in two rounds. Even-numbered months are solved
+    first, all at once. Odd-numbered months are solved next, with the
+    neighbouring edge days of the already solved months fixed. Adjacent
+    months are never solved at the same time, so the consecutive-day rule
+    holds across month boundaries.
 
-    violated_constraints: List[str] = []
-    if pulp.LpStatus[status] != "Optimal":
-        violated_constraints.append("solution_not_optimal")
+    Parameters
+    ----------
+    members: Sequence[Member]
+        Members to schedule.
+    days: Sequence[date]
+        Days to staff, in ascending order, possibly spanning several months.
+    max_workers: Optional[int]
+        Number of worker processes; defaults to the number of CPUs.
+    options: Optional[SolverOptions]
+        Solver backend and limits, applied to each window.
+    fairness, weights:
+        Objective of each window, see :func:`solve_schedule`. Loads are
+        balanced within each month.
+
+    Returns
+    -------
+    Dict[str, object]
+        Merged result in the format of :func:`solve_schedule`.
+    """
+    members = list(members)
+    windows = split_into_months(days)
+    results: Dict[int, Dict[str, object]] = {}
+    one_day = timedelta(days=1)
+
+    def boundary(k: int) -> Dict[date, List[int]]:
+        # Edge days of solved neighbouring windows that touch window k
+        fixed: Dict[date, List[int]] = {}
+        for neighbour, edge, touching in (
+            (k - 1, -1, windows[k][0] - one_day),
+            (k + 1, 0, windows[k][-1] + one_day),
+        ):
+            if neighbour in results:
+                edge_day = windows[neighbour][edge]
+                if edge_day == touching:
+                    fixed[edge_day] = results[neighbour]["assignments"][edge_day]
+        return fixed
+
+    def run(pool, window_numbers: List[int]) -> None:
+        jobs = {
+            k: (members, windows[k], options, boundary(k), fairness, weights)
+            for k in window_numbers
+        }
+        if pool is None:
+            for k, args in jobs.items():
+                results[k] = _solve_window(*args)
+        else:
+            futures = {k: pool.submit(_solve_window, *args) for k, args in jobs.items()}
+            for k, future in futures.items():
+                results[k] = future.result()
+
+    rounds = [list(range(0, len(windows), 2)), list(range(1, len(windows), 2))]
+    workers = min(max_workers or os.cpu_count() or 1, len(rounds[0]))
+    if workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            for window_numbers in rounds:
+                run(pool, window_numbers)
     else:
-        for d in days:
-            staff = assignments[d]
-            if len(staff) != 4:
-                violated_constraints.append(f"staff_count_day_{d.day}")
-            if not any(next((m for m in members if m.id == s and m.is_committee), None) for s in staff):
-                violated_constraints.append(f"committee_day_{d.day}")
-            if not any(next((m for m in members if m.id == s and m.gender == 'M'), None) for s in staff):
-                violated_constraints.append(f"male_day_{d.day}")
-            if not any(next((m for m in members if m.id == s and m.gender == 'F'), None) for s in staff):
-                violated_constraints.append(f"female_day_{d.day}")
+        for window_numbers in rounds:
+            run(None, window_numbers)
 
+    assignments: Dict[date, List[int]] = {}
+    violated_constraints: List[str] = []
+    window_solvers: Dict[str, Dict[str, object]] = {}
+    for k, window in enumerate(windows):
+        result = results[k]
+        assignments.update({d: result["assignments"][d] for d in window})
+        violated_constraints.extend(
+            f"{rule}_{window[0]:%Y-%m}" if rule == "no_feasible_solution" else rule
+            for rule in result["violated_constraints"]
+        )
+        window_solvers[f"{window[0]:%Y-%m}"] = result["solver"]
+
+    assigned = {member_id for staff in assignments.values() for member_id in staff}
     return {
         "assignments": assignments,
-        "unassigned_members": unassigned_members,
+        "unassigned_members": [m.id for m in members if m.id not in assigned],
         "violated_constraints": violated_constraints,
+        "solver": window_solvers,
     }
@@ -1,21 +1,20 @@
-import csv
-from io import StringIO
-from typing import List
+from typing import BinaryIO, Dict, Iterator, List
 from fastapi import UploadFile
 from ..models.shift_request import ShiftRequest
+from . import csv_stream
+
+
+def iter_shift_request_rows(file: BinaryIO) -> Iterator[Dict[str, str]]:
+    """Stream shift request column values from a binary CSV file."""
+    with csv_stream.open_reader(file, dict_rows=True) as reader:
+        for row in reader:
+            yield {
+                "employee_name": row.get("employee_name", ""),
+                "start_time": row.get("start_time", ""),
+                "end_time": row.get("end_time", ""),
+            }
 
 
 def parse_shift_requests(file: UploadFile) -> List[ShiftRequest]:
     """Parse CSV file and return list of ShiftRequest models."""
-    content = file.file.read().decode("utf-8")
-    reader = csv.DictReader(StringIO(content))
-    shift_requests: List[ShiftRequest] = []
-    for row in reader:
-        shift_requests.append(
-            ShiftRequest(
-                employee_name=row.get("employee_name", ""),
-                start_time=row.get("start_time", ""),
-                end_time=row.get("end_time", ""),
-            )
-        )
-    return shift_requests
+    return [ShiftRequest(**row) for row in iter_shift_request_rows(file.file)]
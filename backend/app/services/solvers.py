@@ -0,0 +1,266 @@
+"""Solver backends for the PuLP scheduling model.
+
+The model is always built with PuLP. It is then solved with CBC or HiGHS
+through PuLP, or translated to an OR-Tools CP-SAT model when OR-Tools is
+installed. Every backend honours a time limit, a relative MIP gap and a
+thread count. When the limit is hit, the best feasible solution found is
+kept, together with its gap.
+"""
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from . import metrics
+
+try:
+    import pulp
+except Exception:  # pragma: no cover - dependency resolution handled at runtime
+    pulp = None  # type: ignore
+
+BACKENDS = ("cbc", "highs", "cpsat")
+
+OPTIMAL = "optimal"
+FEASIBLE = "feasible"
+INFEASIBLE = "infeasible"
+NOT_SOLVED = "not_solved"
+
+# Share of the time limit CBC keeps back for the LP relaxation that bounds
+# the gap of a solution found before the limit
+GAP_BOUND_SHARE = 0.1
+
+
+@dataclass
+class SolverOptions:
+    """Solver selection and limits.
+
+    Parameters
+    ----------
+    backend: str
+        One of ``BACKENDS``.
+    time_limit: Optional[float]
+        Maximum run time in seconds.
+    gap_rel: Optional[float]
+        Relative MIP gap at which the search stops, e.g. ``0.01``.
+    threads: Optional[int]
+        Number of solver threads.
+    """
+
+    backend: str = "cbc"
+    time_limit: Optional[float] = None
+    gap_rel: Optional[float] = None
+    threads: Optional[int] = None
+
+
+def _cpsat_available() -> bool:
+    try:
+        from ortools.sat.python import cp_model  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def available_backends() -> List[str]:
+    """Return the backends that can be used in this environment."""
+    if pulp is None:
+        return []
+    backends = []
+    if pulp.PULP_CBC_CMD(msg=False).available():
+        backends.append("cbc")
+    if pulp.HiGHS(msg=False).available():
+        backends.append("highs")
+    if _cpsat_available():
+        backends.append("cpsat")
+    return backends
+
+
+def solve(problem, options: Optional[SolverOptions] = None, warm_start: bool = False) -> Dict[str, object]:
+    """Solve ``problem`` in place and describe the outcome.
+
+    Variable values of the best solution found are left on the PuLP
+    variables. ``warm_start`` passes their initial values to the solver.
+
+    Returns
+    -------
+    Dict[str, object]
+        ``backend``, ``status`` (optimal, feasible, infeasible or
+        not_solved), ``objective``, ``gap`` (relative, None if unknown) and
+        ``time`` in seconds.
+    """
+    if pulp is None:
+        raise RuntimeError("pulp library is required for schedule generation")
+    options = options or SolverOptions()
+    if options.backend not in BACKENDS:
+        raise ValueError(f"Unknown solver backend '{options.backend}'")
+
+    started = time.perf_counter()
+    if not problem.variables():
+        # Presolve decided everything; nothing is left for the solver
+        status, gap = OPTIMAL, 0.0
+    elif options.backend == "cpsat":
+        status, gap = _solve_cpsat(problem, options, warm_start)
+    else:
+        status, gap = _solve_pulp(problem, options, warm_start, started)
+
+    objective = pulp.value(problem.objective) if status in (OPTIMAL, FEASIBLE) else None
+    metrics.inc("shift_solver_runs_total", backend=options.backend, status=status)
+    return {
+        "backend": options.backend,
+        "status": status,
+        "objective": objective,
+        "gap": gap,
+        "time": round(time.perf_counter() - started, 4),
+    }
+
+
+def _pulp_status(problem) -> str:
+    if problem.sol_status == pulp.LpSolutionOptimal:
+        return OPTIMAL
+    if problem.sol_status == pulp.LpSolutionIntegerFeasible:
+        return FEASIBLE
+    if problem.sol_status in (pulp.LpSolutionInfeasible, pulp.LpSolutionUnbounded):
+        return INFEASIBLE
+    return NOT_SOLVED
+
+
+def _solve_pulp(problem, options: SolverOptions, warm_start: bool, started: float):
+    if options.backend == "highs":
+        solver = pulp.HiGHS(
+            msg=False,
+            timeLimit=options.time_limit,
+            gapRel=options.gap_rel,
+            threads=options.threads,
+        )
+    else:
+        time_limit = options.time_limit
+        if time_limit is not None:
+            time_limit *= 1 - GAP_BOUND_SHARE
+        solver = pulp.PULP_CBC_CMD(
+            msg=False,
+            timeLimit=time_limit,
+            gapRel=options.gap_rel,
+            threads=options.threads,
+            warmStart=warm_start,
+        )
+    problem.solve(solver)
+    status = _pulp_status(problem)
+
+    gap: Optional[float] = None
+    if status == OPTIMAL:
+        gap = 0.0
+    elif status == FEASIBLE:
+        highs = getattr(problem, "solverModel", None)
+        if options.backend == "highs" and highs is not None:
+            gap = highs.getInfo().mip_gap
+        else:
+            gap = _relaxation_gap(problem, options, started)
+    return status, gap
+
+
+def _relaxation_gap(problem, options: SolverOptions, started: float) -> Optional[float]:
+    """Bound the gap of the current incumbent with the LP relaxation.
+
+    CBC does not report its best bound through PuLP, so the relaxation is
+    solved instead, with the thread count of the main solve and whatever
+    is left of its time limit since ``started``; the main solve leaves
+    ``GAP_BOUND_SHARE`` of the limit for it. This is an upper bound on the
+    true gap; None is returned when no time is left or the relaxation is
+    not solved to optimality. The incumbent's values and status are
+    restored afterwards.
+    """
+    time_limit = options.time_limit
+    if time_limit is not None:
+        time_limit -= time.perf_counter() - started
+        if time_limit <= 0:
+            return None
+    variables = problem.variables()
+    incumbent = [v.varValue for v in variables]
+    incumbent_objective = pulp.value(problem.objective)
+    saved_status = (problem.status, problem.sol_status)
+    try:
+        problem.solve(
+            pulp.PULP_CBC_CMD(
+                msg=False,
+                mip=False,
+                timeLimit=time_limit,
+                threads=options.threads,
+            )
+        )
+        bound = pulp.value(problem.objective) if problem.status == pulp.LpStatusOptimal else None
+    finally:
+        for v, value in zip(variables, incumbent):
+            v.varValue = value
+        problem.status, problem.sol_status = saved_status
+    if bound is None or incumbent_objective is None:
+        return None
+    return _gap(incumbent_objective, bound)
+
+
+def _gap(objective: float, bound: float) -> float:
+    return abs(objective - bound) / max(abs(objective), 1e-9)
+
+
+def _solve_cpsat(problem, options: SolverOptions, warm_start: bool):
+    """Translate ``problem`` to CP-SAT, solve it and copy the values back.
+
+    All variables must be integer with finite bounds and all constraint
+    coefficients integral. Objective coefficients are scaled to integers.
+    """
+    from ortools.sat.python import cp_model
+
+    model = cp_model.CpModel()
+    cp_vars = {}
+    for v in problem.variables():
+        if v.cat != pulp.LpInteger or v.lowBound is None or v.upBound is None:
+            raise ValueError(f"CP-SAT needs bounded integer variables, got '{v.name}'")
+        cp_vars[v.name] = model.NewIntVar(int(v.lowBound), int(v.upBound), v.name)
+        if warm_start and v.varValue is not None:
+            model.AddHint(cp_vars[v.name], int(round(v.varValue)))
+
+    for name, constraint in problem.constraints.items():
+        terms = []
+        for v, coefficient in constraint.items():
+            if coefficient != int(coefficient):
+                raise ValueError(f"CP-SAT needs integral coefficients in '{name}'")
+            terms.append(int(coefficient) * cp_vars[v.name])
+        rhs = -constraint.constant
+        expr = sum(terms)
+        if constraint.sense == pulp.LpConstraintEQ:
+            model.Add(expr == int(rhs))
+        elif constraint.sense == pulp.LpConstraintLE:
+            model.Add(expr <= math.floor(rhs))
+        else:
+            model.Add(expr >= math.ceil(rhs))
+
+    # Scale the objective so that fractional weights survive rounding
+    scale = 1000
+    objective = sum(
+        int(round(coefficient * scale)) * cp_vars[v.name]
+        for v, coefficient in problem.objective.items()
+    )
+    if problem.sense == pulp.LpMinimize:
+        model.Minimize(objective)
+    else:
+        model.Maximize(objective)
+
+    solver = cp_model.CpSolver()
+    if options.time_limit is not None:
+        solver.parameters.max_time_in_seconds = options.time_limit
+    if options.gap_rel is not None:
+        solver.parameters.relative_gap_limit = options.gap_rel
+    if options.threads is not None:
+        solver.parameters.num_workers = options.threads
+    result = solver.Solve(model)
+
+    if result not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        status = INFEASIBLE if result == cp_model.INFEASIBLE else NOT_SOLVED
+        return status, None
+    for v in problem.variables():
+        v.varValue = solver.Value(cp_vars[v.name])
+    if result == cp_model.OPTIMAL:
+        return OPTIMAL, 0.0
+    return FEASIBLE, _gap(solver.ObjectiveValue(), solver.BestObjectiveBound())
@@ -0,0 +1,140 @@
+"""Vectorized checks of a schedule against the hard scheduling rules."""
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from .availability_index import AvailabilityIndex
+
+STAFF_PER_DAY = 4
+
+
+def attribute_vectors(members: Sequence) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return boolean committee, male and female vectors indexed like ``members``."""
+    committee = np.fromiter((bool(m.is_committee) for m in members), dtype=bool, count=len(members))
+    male = np.fromiter((m.gender == "M" for m in members), dtype=bool, count=len(members))
+    female = np.fromiter((m.gender == "F" for m in members), dtype=bool, count=len(members))
+    return committee, male, female
+
+
+def assignment_matrix(
+    members: Sequence,
+    days: Sequence[date],
+    assignments: Mapping[date, Iterable[int]],
+) -> np.ndarray:
+    """Return a member x day boolean matrix of ``assignments``.
+
+    Member ids that are not in ``members`` and days not in ``days`` are
+    ignored.
+    """
+    member_pos = {m.id: i for i, m in enumerate(members)}
+    rows: List[int] = []
+    cols: List[int] = []
+    for j, d in enumerate(days):
+        for member_id in assignments.get(d, ()):
+            i = member_pos.get(member_id)
+            if i is not None:
+                rows.append(i)
+                cols.append(j)
+    matrix = np.zeros((len(members), len(days)), dtype=bool)
+    matrix[rows, cols] = True
+    return matrix
+
+
+def consecutive_day_pairs(days: Sequence[date]) -> np.ndarray:
+    """Return the positions ``j`` for which ``days[j + 1]`` is the day after ``days[j]``."""
+    ordinals = np.fromiter((d.toordinal() for d in days), dtype=np.int64, count=len(days))
+    return np.flatnonzero(np.diff(ordinals) == 1)
+
+
+def find_violations(members: Sequence, days: Sequence[date], matrix: np.ndarray) -> List[str]:
+    """Return the rules violated by a member x day assignment ``matrix``.
+
+    Checks four members per day, at least one committee member, one male and
+    one female per day, and no member on two consecutive calendar days.
+    """
+    committee, male, female = attribute_vectors(members)
+    staff = matrix.sum(axis=0)
+    day_checks = [
+        ("staff_count", staff != STAFF_PER_DAY),
+        ("committee", committee @ matrix == 0),
+        ("male", male @ matrix == 0),
+        ("female", female @ matrix == 0),
+    ]
+
+    violations: List[str] = []
+    for j in range(len(days)):
+        for rule, failed in day_checks:
+            if failed[j]:
+                violations.append(f"{rule}_day_{days[j].isoformat()}")
+
+    pairs = consecutive_day_pairs(days)
+    if len(pairs):
+        repeated = matrix[:, pairs] & matrix[:, pairs + 1]
+        for i, k in zip(*np.nonzero(repeated)):
+            violations.append(f"no_consecutive_member_{members[i].id}_day_{days[pairs[k]].isoformat()}")
+    return violations
+
+
+def validate_schedule(
+    members: Sequence,
+    days: Sequence[date],
+    assignments: Mapping[date, Iterable[int]],
+) -> List[str]:
+    """Return the rules violated by ``assignments`` (member ids per day).
+
+    Works for any schedule, including the greedy one; ``members`` only need
+    ``id``, ``gender`` and ``is_committee`` attributes.
+    """
+    return find_violations(members, days, assignment_matrix(members, days, assignments))
+
+
+def day_supply(index: AvailabilityIndex, members: Sequence) -> Dict[str, np.ndarray]:
+    """Count the available, committee, male and female members of each day.
+
+    Counts are indexed like ``index.dates`` and come from popcounts of the
+    index's day masks, so the cost is linear in the index size. Every member
+    must be in ``index``.
+    """
+    attribute_masks = {"committee": 0, "male": 0, "female": 0}
+    for m in members:
+        bit = 1 << index.member_position(m.id)
+        if m.is_committee:
+            attribute_masks["committee"] |= bit
+        if m.gender == "M":
+            attribute_masks["male"] |= bit
+        elif m.gender == "F":
+            attribute_masks["female"] |= bit
+
+    day_masks = [index.date_mask(d) for d in index.dates]
+    supply = {"available": np.array([mask.bit_count() for mask in day_masks], dtype=np.int64)}
+    for name, attribute_mask in attribute_masks.items():
+        supply[name] = np.array(
+            [(mask & attribute_mask).bit_count() for mask in day_masks], dtype=np.int64
+        )
+    return supply
+
+
+def diagnose_days(index: AvailabilityIndex, members: Sequence) -> Dict[str, Dict[str, object]]:
+    """Explain which days cannot meet the rules with the available members.
+
+    Returns the supply counts of every such day by ISO date, with ``rules``
+    naming the unmeetable rules like :func:`find_violations` does. The
+    consecutive-day rule can still make other days fall short; those only
+    show up when the schedule is validated.
+    """
+    supply = day_supply(index, members)
+    failed = {
+        "staff_count": supply["available"] < STAFF_PER_DAY,
+        "committee": supply["committee"] == 0,
+        "male": supply["male"] == 0,
+        "female": supply["female"] == 0,
+    }
+    diagnosis: Dict[str, Dict[str, object]] = {}
+    for j in np.flatnonzero(np.logical_or.reduce(list(failed.values()))):
+        iso = index.dates[j].isoformat()
+        diagnosis[iso] = {name: int(counts[j]) for name, counts in supply.items()}
+        diagnosis[iso]["rules"] = [f"{rule}_day_{iso}" for rule, mask in failed.items() if mask[j]]
+    return diagnosis
@@ -0,0 +1,7 @@
+"""Benchmarks for schedule generation and CSV ingestion.
+
+Run from the repository root::
+
+    python -m backend.benchmarks run --members 50,500,5000 --days 30,365 -o head.json
+    python -m backend.benchmarks compare base.json head.json
+"""
@@ -0,0 +1,83 @@
+"""Command line for the benchmark suite; see ``backend.benchmarks``."""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import warnings
+from typing import List, Optional
+
+from . import suite
+
+BENCHMARKS = (
+    "upload_members",
+    "upload_availabilities",
+    "simple_schedule_assignment",
+    "generate_schedule",
+    "get_latest_schedule",
+)
+
+
+def _ints(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks and write JSON results")
+    run.add_argument("--members", type=_ints, default=[50, 500], help="comma-separated roster sizes")
+    run.add_argument("--days", type=_ints, default=[30, 90], help="comma-separated numbers of days")
+    run.add_argument("--density", type=float, default=0.4, help="share of available cells")
+    run.add_argument("--rounds", type=int, default=3)
+    run.add_argument("--time-limit", type=float, default=30.0, help="ILP time limit in seconds")
+    run.add_argument("--skip", action="append", default=[], choices=BENCHMARKS)
+    run.add_argument("-o", "--output", help="result file; printed to stdout if omitted")
+
+    diff = commands.add_parser("compare", help="compare two result files")
+    diff.add_argument("base")
+    diff.add_argument("head")
+    diff.add_argument(
+        "--threshold", type=float, default=0.2,
+        help="relative slowdown reported as a regression (default 0.2)",
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        warnings.simplefilter("ignore", DeprecationWarning)
+        results = suite.run_suite(
+            args.members, args.days, args.density, args.rounds, args.time_limit, args.skip
+        )
+        body = json.dumps(results, indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(body + "\n")
+        else:
+            print(body)
+        for r in results["results"]:
+            print(
+                f"{r['benchmark']:<28} {r['members']:>6} x {r['days']:>3}  "
+                f"median {r['median'] * 1000:10.2f} ms",
+                file=sys.stderr,
+            )
+        return 0
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.head, encoding="utf-8") as f:
+        head = json.load(f)
+    rows = suite.compare(base, head, args.threshold)
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['benchmark']:<28} {row['members']:>6} x {row['days']:>3}  "
+            f"{row['base'] * 1000:10.2f} ms -> {row['head'] * 1000:10.2f} ms  "
+            f"x{row['ratio']:.2f}{flag}"
+        )
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
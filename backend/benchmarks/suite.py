@@ -0,0 +1,205 @@
+"""Timed benchmark cases and comparison of result files.
+
+The application reads ``DATABASE_URL`` and ``SCHEDULE_DATA_DIR`` when it is
+first imported, so :func:`run_suite` points both at a temporary directory
+before importing it. Run the suite in a fresh process, as the command line
+in ``backend.benchmarks`` does.
+"""
+from __future__ import annotations
+
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from . import synthetic
+
+START = date(2025, 4, 1)
+
+
+def _time(fn: Callable[[], object], rounds: int, setup: Optional[Callable[[], object]] = None) -> Dict[str, float]:
+    """Run ``fn`` ``rounds`` times and summarize the wall-clock times in seconds."""
+    timings = []
+    for _ in range(rounds):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return {
+        "rounds": rounds,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _check(response) -> None:
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.url}: {response.status_code} {response.text[:200]}")
+
+
+def run_suite(
+    member_counts: Sequence[int],
+    day_counts: Sequence[int],
+    density: float = 0.4,
+    rounds: int = 3,
+    time_limit: float = 30.0,
+    skip: Iterable[str] = (),
+) -> Dict[str, object]:
+    """Run every benchmark for each roster size and return the results.
+
+    Parameters
+    ----------
+    member_counts, day_counts: Sequence[int]
+        Roster sizes; every combination is benchmarked.
+    density: float
+        Share of available member/day cells.
+    rounds: int
+        Repetitions per benchmark; ``/schedules/latest`` uses ten times as many.
+    time_limit: float
+        Solver time limit for ``scheduler.generate_schedule`` in seconds.
+    skip: Iterable[str]
+        Names of benchmarks to leave out.
+
+    Returns
+    -------
+    Dict[str, object]
+        ``meta`` describing the run and one ``results`` entry per benchmark
+        and roster size.
+    """
+    workdir = tempfile.mkdtemp(prefix="shift-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["SCHEDULE_DATA_DIR"] = os.path.join(workdir, "data")
+
+    from fastapi.testclient import TestClient
+
+    from ..app.db import Base, SessionLocal, engine, init_db
+    from ..app.main import app
+    from ..app.models.member import Member
+    from ..app.routers.shift_generation import _load_greedy_members, simple_schedule_assignment
+    from ..app.services import scheduler
+    from ..app.services.solvers import SolverOptions
+
+    skip = set(skip)
+    client = TestClient(app)
+    results: List[Dict[str, object]] = []
+
+    for members in member_counts:
+        members_body = synthetic.members_csv(members)
+        for days in day_counts:
+            availability_body = synthetic.availability_csv(members, days, density, START)
+            Base.metadata.drop_all(bind=engine)
+            init_db()
+
+            def record(name: str, timing: Dict[str, float]) -> None:
+                results.append(
+                    {"benchmark": name, "members": members, "days": days, "density": density, **timing}
+                )
+
+            def clear_members() -> None:
+                with SessionLocal() as db:
+                    db.query(Member).delete()
+                    db.commit()
+
+            def upload(path: str, body: bytes) -> Callable[[], None]:
+                return lambda: _check(
+                    client.post(path, files={"file": ("bench.csv", body, "text/csv")})
+                )
+
+            upload_members = upload("/members/upload-csv", members_body)
+            if "upload_members" not in skip:
+                record("upload_members", _time(upload_members, rounds, setup=clear_members))
+            else:
+                upload_members()
+
+            upload_availabilities = upload("/availabilities/upload-csv", availability_body)
+            if "upload_availabilities" not in skip:
+                record("upload_availabilities", _time(upload_availabilities, rounds))
+            else:
+                upload_availabilities()
+
+            if "simple_schedule_assignment" not in skip:
+                with SessionLocal() as db:
+                    orm_members, dates, index = _load_greedy_members(db)
+                    record(
+                        "simple_schedule_assignment",
+                        _time(lambda: simple_schedule_assignment(orm_members, index, dates), rounds),
+                    )
+
+            if "generate_schedule" not in skip and scheduler.pulp is not None:
+                options = SolverOptions(time_limit=time_limit)
+                with SessionLocal() as db:
+                    record(
+                        "generate_schedule",
+                        _time(lambda: scheduler.generate_schedule(START, db, options), rounds),
+                    )
+
+            if "get_latest_schedule" not in skip:
+                _check(client.post("/shift-generation/generate?engine=greedy"))
+                record(
+                    "get_latest_schedule",
+                    _time(lambda: _check(client.get("/schedules/latest")), rounds * 10),
+                )
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def _key(result: Dict[str, object]):
+    return (result["benchmark"], result["members"], result["days"], result["density"])
+
+
+def compare(
+    base: Dict[str, object],
+    head: Dict[str, object],
+    threshold: float = 0.2,
+) -> List[Dict[str, object]]:
+    """Compare the median times of two result files.
+
+    Returns one row per benchmark present in both, with ``ratio`` of head to
+    base time and ``regression`` set when head is more than ``threshold``
+    (relative) slower.
+    """
+    base_results = {_key(r): r for r in base["results"]}
+    rows = []
+    for result in head["results"]:
+        previous = base_results.get(_key(result))
+        if previous is None:
+            continue
+        ratio = result["median"] / previous["median"] if previous["median"] else float("inf")
+        rows.append(
+            {
+                "benchmark": result["benchmark"],
+                "members": result["members"],
+                "days": result["days"],
+                "density": result["density"],
+                "base": previous["median"],
+                "head": result["median"],
+                "ratio": ratio,
+                "regression": ratio > 1 + threshold,
+            }
+        )
+    return rows
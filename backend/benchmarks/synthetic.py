@@ -0,0 +1,56 @@
+"""Synthetic rosters and availability sheets shaped like ``Shift_*.csv``."""
+from __future__ import annotations
+
+import random
+from datetime import date, timedelta
+from typing import List, Tuple
+
+AVAILABLE = "○"
+UNAVAILABLE = "×"
+
+
+def roster(members: int, seed: int = 0) -> List[Tuple[str, str, bool]]:
+    """Return ``(name, gender, is_committee)`` for ``members`` synthetic members.
+
+    Genders are split evenly and about one member in five is on the
+    committee, roughly like the real roster.
+    """
+    rng = random.Random(seed)
+    return [
+        (f"member{i:05d}", "M" if i % 2 else "F", rng.random() < 0.2)
+        for i in range(members)
+    ]
+
+
+def members_csv(members: int, seed: int = 0) -> bytes:
+    """Return a members upload (``name,gender,is_committee``) as UTF-8 bytes."""
+    lines = ["name,gender,is_committee"]
+    lines.extend(
+        f"{name},{gender},{'true' if committee else 'false'}"
+        for name, gender, committee in roster(members, seed)
+    )
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def availability_csv(
+    members: int,
+    days: int,
+    density: float = 0.4,
+    start: date = date(2025, 4, 1),
+    seed: int = 0,
+) -> bytes:
+    """Return a wide availability sheet like ``Shift_4.csv``.
+
+    The header row holds the member names; each following row is a date in
+    ``YYYY/M/D`` form followed by ○ or × per member. Each cell is ○ with
+    probability ``density``. The output starts with a BOM, as spreadsheet
+    exports do.
+    """
+    rng = random.Random(seed + 1)
+    names = [name for name, _, _ in roster(members, seed)]
+    lines = ["," + ",".join(names)]
+    for k in range(days):
+        d = start + timedelta(days=k)
+        cells = (AVAILABLE if rng.random() < density else UNAVAILABLE for _ in names)
+        lines.append(f"{d.year}/{d.month}/{d.day}," + ",".join(cells))
+    return ("\ufeff" + "\n".join(lines) + "\n").encode("utf-8")
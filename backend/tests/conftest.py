@@ -0,0 +1,20 @@
+import os
+
+# Routers create their tables on import; keep them out of ./test.db
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from ..app.services.scheduler import Member  # noqa: E402
+
+
+def make_members(days, count=8):
+    # Alternating gender, every fourth member on the committee
+    return [
+        Member(
+            id=i,
+            name=f"m{i}",
+            gender="M" if i % 2 else "F",
+            is_committee=i % 4 == 0,
+            preferred_days=set(days),
+        )
+        for i in range(count)
+    ]
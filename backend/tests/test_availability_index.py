@@ -0,0 +1,32 @@
+from datetime import date
+
+from ..app.services.availability_index import AvailabilityIndex
+from ..app.services.scheduler import Member
+
+
+def test_available_members_and_load_order():
+    days = [date(2025, 4, 10), date(2025, 4, 11)]
+    index = AvailabilityIndex.from_mapping(
+        {1: [days[0]], 2: days, 3: [days[0], days[1]]},
+        member_ids=[1, 2, 3],
+        dates=days,
+    )
+    assert index.available_members(days[0]) == [1, 2, 3]
+    assert index.available_members(days[1]) == [2, 3]
+    assert index.available_count(days[0]) == 3
+    assert index.is_available(1, days[0])
+    assert not index.is_available(1, days[1])
+    # Positions ordered by load, ties keep member order
+    assert index.available_by_load(days[0], [2, 0, 0]) == [1, 2, 0]
+
+
+def test_from_members_treats_empty_preferences_as_always_available():
+    days = [date(2025, 4, 10), date(2025, 4, 11)]
+    members = [
+        Member(id=1, name="A", gender="M", is_committee=True),
+        Member(id=2, name="B", gender="F", is_committee=False, preferred_days={days[1]}),
+    ]
+    index = AvailabilityIndex.from_members(members, days)
+    assert index.available_members(days[0]) == [1]
+    assert index.available_members(days[1]) == [1, 2]
+    assert index.member_mask(1) == 0b11
@@ -0,0 +1,57 @@
+import io
+
+import numpy as np
+
+from ..app.services import availability_sheet
+
+
+def _parse(text):
+    return availability_sheet.parse(io.BytesIO(text.encode("utf-8")))
+
+
+def test_parse_maps_symbols_and_reports_invalid_cells():
+    sheet = _parse("﻿,立田,柴田,畠山\n2025/4/10,○, × ,?\n,○,○\n2025-04-11,x,o\nonly\n")
+    assert sheet.member_names == ["立田", "柴田", "畠山"]
+    assert sheet.row_numbers.tolist() == [2, 4]
+    assert sheet.dates.astype(str).tolist() == ["2025-04-10", "2025-04-11"]
+    assert sheet.codes.tolist() == [[1, 0, 2], [0, 1, 0]]
+    rows, columns = sheet.invalid_cells
+    assert (rows.tolist(), columns.tolist(), sheet.invalid_values) == ([0], [2], ["?"])
+
+
+def test_parse_dates_rejects_malformed_and_impossible_dates():
+    dates = availability_sheet.parse_dates(
+        ["2025/4/10", "2024-02-29", "2025/2/29", "2025/4-10", "2025/13/1", "April"]
+    )
+    assert dates.astype(str).tolist() == ["2025-04-10", "2024-02-29", "NaT", "NaT", "NaT", "NaT"]
+
+
+def test_available_by_date_merges_repeated_dates():
+    sheet = _parse(",A,B\n2025/4/10,○,×\n2025/4/9,×,×\n2025/4/10,×,○\nbad,○,○\n")
+    dates, available = sheet.available_by_date()
+    assert dates.astype(str).tolist() == ["2025-04-09", "2025-04-10"]
+    assert np.array_equal(available, [[False, False], [True, True]])
+
+
+def test_diff_is_scoped_to_uploaded_members_and_date_range():
+    dates = np.array(["2025-04-10", "2025-04-12"], dtype="datetime64[D]")
+    available = np.array([[True, False], [True, True], [True, True]])
+    stored_members = np.array([7, 7, 7, 3, 9, 3])
+    stored_dates = np.array(
+        ["2025-04-10", "2025-04-11", "2025-04-20", "2025-04-12", "2025-04-10", "2025-04-09"],
+        dtype="datetime64[D]",
+    )
+    days, inserts, deletes = availability_sheet.diff(
+        np.array([7, 3, -1]), dates, available, stored_members, stored_dates
+    )
+    assert days.astype(str).tolist() == ["2025-04-10", "2025-04-11", "2025-04-12"]
+    assert inserts.tolist() == [
+        [False, False, False],
+        [True, False, False],
+        [False, False, False],
+    ]
+    assert deletes.tolist() == [
+        [False, True, False],
+        [False, False, False],
+        [False, False, False],
+    ]
@@ -0,0 +1,93 @@
+import anyio
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from ..app.db import Base, get_async_db
+from ..app.models.availability import Availability
+from ..app.models.member import Member
+from ..app.routers import availabilities
+
+TestClient = pytest.importorskip("fastapi.testclient").TestClient
+
+
+@pytest.fixture
+def client():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        async with sessions() as db:
+            db.add_all([Member(name="A", gender="M"), Member(name="B", gender="F")])
+            await db.commit()
+
+    async def get_db():
+        async with sessions() as db:
+            yield db
+
+    async def stored():
+        async with sessions() as db:
+            rows = await db.execute(
+                select(Member.name, Availability.date)
+                .join(Member, Member.id == Availability.member_id)
+                .order_by(Member.name, Availability.date)
+            )
+            return [(name, day.isoformat()) for name, day in rows]
+
+    anyio.run(setup)
+    app = FastAPI()
+    app.include_router(availabilities.router)
+    app.dependency_overrides[get_async_db] = get_db
+    test_client = TestClient(app)
+    test_client.stored = lambda: anyio.run(stored)
+    yield test_client
+    anyio.run(engine.dispose)
+
+
+def _upload(client, sheet, mode):
+    return client.post(
+        f"/availabilities/upload-csv?mode={mode}",
+        files={"file": ("a.csv", sheet.encode("utf-8"))},
+    )
+
+
+def test_merge_upload_applies_only_the_differences(client):
+    response = _upload(client, ",A,B\n2025/4/10,○,×\n2025/4/12,○,○\n", "merge")
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert (body["inserted"], body["deleted"], body["unchanged"]) == (3, 0, 0)
+
+    # A loses 4/12; 4/10 lies outside the sheet's range and is kept
+    response = _upload(client, ",A,B\n2025/4/11,×,○\n2025/4/12,×,○\n", "merge")
+    body = response.json()
+    assert (body["inserted"], body["deleted"], body["unchanged"]) == (1, 1, 1)
+    assert client.stored() == [("A", "2025-04-10"), ("B", "2025-04-11"), ("B", "2025-04-12")]
+
+
+def test_import_reports_the_replaced_rows(client):
+    _upload(client, ",A,B\n2025/4/10,○,×\n2025/4/11,○,○\n", "replace")
+    exported = client.get("/availabilities/export").content
+
+    response = client.post("/availabilities/import", files={"file": ("a.npz", exported)})
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert body["mode"] == "replace"
+    assert (body["inserted"], body["deleted"], body["unchanged"]) == (3, 3, 0)
+    assert client.stored() == [("A", "2025-04-10"), ("A", "2025-04-11"), ("B", "2025-04-11")]
+
+
+def test_merge_upload_keeps_stored_values_of_invalid_cells(client):
+    _upload(client, ",A,B\n2025/4/10,○,○\n2025/4/11,×,○\n", "replace")
+
+    response = _upload(client, ",A,B\n2025/4/10,?,×\n2025/4/11,o?,×\n", "merge")
+    body = response.json()
+    assert body["errors"] == [
+        "Row 2, Member 'A': Invalid availability '?'. Use ○ for available, × for not available",
+        "Row 3, Member 'A': Invalid availability 'o?'. Use ○ for available, × for not available",
+    ]
+    assert (body["inserted"], body["deleted"]) == (0, 2)
+    assert client.stored() == [("A", "2025-04-10")]
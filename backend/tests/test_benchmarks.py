@@ -0,0 +1,22 @@
+import csv
+import io
+
+from ..benchmarks import suite, synthetic
+
+
+def test_availability_csv_matches_upload_format():
+    body = synthetic.availability_csv(members=3, days=2, density=1.0)
+    rows = list(csv.reader(io.StringIO(body.decode("utf-8-sig"))))
+    assert rows[0] == ["", "member00000", "member00001", "member00002"]
+    assert rows[1] == ["2025/4/1", "○", "○", "○"]
+    assert len(rows) == 3
+
+
+def test_compare_flags_regressions():
+    def results(median):
+        return {"results": [{"benchmark": "b", "members": 50, "days": 30, "density": 0.4, "median": median}]}
+
+    (row,) = suite.compare(results(1.0), results(1.5), threshold=0.2)
+    assert row["regression"]
+    assert row["ratio"] == 1.5
+    assert not suite.compare(results(1.0), results(1.1), threshold=0.2)[0]["regression"]
@@ -0,0 +1,70 @@
+import io
+from datetime import date
+
+import numpy as np
+import pytest
+
+from ..app.services import columnar
+
+DATES = [date(2025, 4, 10), date(2025, 4, 11), date(2025, 4, 14)]
+
+
+def test_availability_matrix_round_trips_through_memory_mapped_file(tmp_path):
+    matrix = np.array([[1, 0, 1], [0, 0, 0], [1, 1, 1]], dtype=bool)
+    table = columnar.pack("availability", [3, 5, 8], ["立田", "柴田", "畠山"], DATES, matrix)
+    path = tmp_path / "availability.npz"
+    columnar.save(table, path)
+
+    loaded = columnar.load(path)
+    assert isinstance(loaded.bits, np.memmap)
+    assert loaded.kind == "availability"
+    assert loaded.member_ids.tolist() == [3, 5, 8]
+    assert loaded.member_names.tolist() == ["立田", "柴田", "畠山"]
+    assert loaded.date_list() == DATES
+    assert np.array_equal(loaded.matrix, matrix)
+    assert np.array_equal(columnar.load(path, mmap=False).matrix, matrix)
+
+
+def test_schedule_round_trips_with_its_other_fields():
+    schedule = {
+        "dates": {"2025-04-10": ["A", "B"], "2025-04-11": ["C"]},
+        "assign_count": {"A": 1, "B": 1, "C": 1},
+        "unapplied_rules": ["staff_count_day_2025-04-11"],
+        "id": 4,
+    }
+    restored = columnar.to_schedule(columnar.loads(columnar.dumps(columnar.from_schedule(schedule))))
+    assert restored == {key: value for key, value in schedule.items() if key != "id"}
+
+
+def test_loads_rejects_other_files():
+    with pytest.raises(ValueError):
+        columnar.loads(b"not a matrix")
+    with pytest.raises(ValueError):
+        columnar.to_schedule(
+            columnar.pack("availability", [1], ["A"], DATES, np.ones((1, 3), dtype=bool))
+        )
+
+
+def test_load_upload_maps_stored_archives_and_reads_compressed_ones():
+    matrix = np.array([[1, 0, 1], [0, 1, 1]], dtype=bool)
+    table = columnar.pack("availability", [3, 5], ["A", "B"], DATES, matrix)
+
+    loaded = columnar.load_upload(io.BytesIO(columnar.dumps(table)))
+    assert isinstance(loaded.bits, np.memmap)
+    assert np.array_equal(loaded.matrix, matrix)
+
+    compressed = io.BytesIO()
+    np.savez_compressed(
+        compressed,
+        kind=np.array("availability"),
+        version=np.array(columnar.FORMAT_VERSION),
+        member_ids=table.member_ids,
+        member_names=table.member_names,
+        dates=table.dates,
+        bits=table.bits,
+    )
+    compressed.seek(0)
+    assert np.array_equal(columnar.load_upload(compressed).matrix, matrix)
+
+    with pytest.raises(ValueError):
+        columnar.load_upload(io.BytesIO(b"not a matrix"))
@@ -0,0 +1,31 @@
+import io
+
+import anyio
+
+from ..app.services import csv_stream
+
+
+def test_open_reader_strips_bom_and_keeps_file_open():
+    data = io.BytesIO("﻿,立田,柴田\r\n2025/4/10,○,×\r\n".encode("utf-8"))
+    with csv_stream.open_reader(data) as reader:
+        rows = list(reader)
+    assert rows == [["", "立田", "柴田"], ["2025/4/10", "○", "×"]]
+    assert not data.closed
+
+
+def test_open_reader_dict_rows():
+    data = io.BytesIO("﻿name,gender\nA,M\n".encode("utf-8"))
+    with csv_stream.open_reader(data, dict_rows=True) as reader:
+        assert list(reader) == [{"name": "A", "gender": "M"}]
+
+
+def test_batched():
+    assert list(csv_stream.batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(csv_stream.batched([], 2)) == []
+
+
+def test_iterate_in_thread_yields_all_items():
+    async def collect():
+        return [item async for item in csv_stream.iterate_in_thread(iter(range(5)), chunk=2)]
+
+    assert anyio.run(collect) == [0, 1, 2, 3, 4]
@@ -0,0 +1,13 @@
+import pytest
+
+from ..app.db import async_database_url
+
+
+def test_async_database_url_swaps_the_driver():
+    assert async_database_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+    assert (
+        async_database_url("postgresql+psycopg2://user:secret@db/shift_maker")
+        == "postgresql+asyncpg://user:secret@db/shift_maker"
+    )
+    with pytest.raises(ValueError):
+        async_database_url("mysql://db/shift_maker")
@@ -0,0 +1,32 @@
+from datetime import date, timedelta
+
+from ..app.services import heuristic, validation
+from .conftest import make_members
+
+
+def test_heuristic_meets_hard_rules_and_balances_load():
+    days = [date(2025, 4, 1) + timedelta(days=k) for k in range(12)]
+    members = make_members(days, count=12)
+    result = heuristic.solve_heuristic(members, days, budget_ms=50, seed=0)
+    assert result["violated_constraints"] == []
+    assert validation.validate_schedule(members, days, result["assignments"]) == []
+    loads = [sum(m.id in staff for staff in result["assignments"].values()) for m in members]
+    assert max(loads) - min(loads) <= 1
+
+
+def test_heuristic_respects_availability_and_fixed_days():
+    days = [date(2025, 4, 1) + timedelta(days=k) for k in range(3)]
+    members = make_members(days, count=12)
+    members[4].preferred_days = {days[0]}
+    fixed = {days[0]: [0, 1, 2, 3]}
+    result = heuristic.solve_heuristic(members, days, budget_ms=20, fixed=fixed, seed=0)
+    assert result["assignments"][days[0]] == [0, 1, 2, 3]
+    assert not set(result["assignments"][days[1]]) & {0, 1, 2, 3, 4}
+    assert result["violated_constraints"] == []
+
+
+def test_heuristic_reports_unstaffable_day():
+    days = [date(2025, 4, 1)]
+    members = [m for m in make_members(days) if not m.is_committee]
+    result = heuristic.solve_heuristic(members, days, budget_ms=10, seed=0)
+    assert result["violated_constraints"] == ["committee_day_2025-04-01"]
@@ -0,0 +1,46 @@
+import time
+
+from ..app.services import jobs
+
+
+def _wait(manager, job_id):
+    for _ in range(200):
+        job = manager.get(job_id)
+        if job.finished:
+            return job
+        time.sleep(0.05)
+    raise AssertionError("job did not finish")
+
+
+def test_job_runs_in_pool_and_transforms_result():
+    manager = jobs.JobManager(max_workers=1, timeout=30)
+    try:
+        job = manager.submit(pow, 2, 10, on_result=lambda value: value + 1)
+        job = _wait(manager, job.id)
+        assert job.status == jobs.DONE
+        assert job.result == 1025
+        assert manager.get("missing") is None
+    finally:
+        manager.shutdown()
+
+
+def _poll(manager, job_id, status):
+    for _ in range(200):
+        job = manager.get(job_id)
+        if job.status == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job never reached {status}")
+
+
+def test_job_timeout_counts_from_start_and_keeps_a_late_result():
+    manager = jobs.JobManager(max_workers=1, timeout=0.2)
+    try:
+        job = manager.submit(time.sleep, 0.5, on_result=lambda _: "late")
+        job = _poll(manager, job.id, jobs.TIMEOUT)
+        assert job.error
+        assert job.started_at >= job.created_at
+        job = _poll(manager, job.id, jobs.DONE)
+        assert (job.result, job.error) == ("late", None)
+    finally:
+        manager.shutdown()
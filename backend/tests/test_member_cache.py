@@ -0,0 +1,52 @@
+import anyio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from ..app.db import Base
+from ..app.models import availability  # noqa: F401 - target of Member.availabilities
+from ..app.models.member import Member
+from ..app.services.member_cache import MemberCache, MemberInfo
+
+
+async def _with_session(body):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    try:
+        async with async_sessionmaker(engine)() as db:
+            db.add_all([Member(name="A", gender="M"), Member(name="B", gender="F", is_committee=True)])
+            await db.commit()
+            return await body(db)
+    finally:
+        await engine.dispose()
+
+
+def test_member_cache_loads_once_and_tracks_writes():
+    async def body(db):
+        cache = MemberCache()
+        assert await cache.ids(db, ["B", "Z", "A"]) == {"B": 2, "A": 1}
+        assert (await cache.members(db))["B"] == MemberInfo(2, "F", True)
+
+        db.add(Member(name="C", gender="F"))
+        await db.commit()
+        # Not reloaded: C is only seen once it is recorded or invalidated
+        assert "C" not in await cache.ids(db, ["C"])
+        cache.put("C", MemberInfo(3, "F", False))
+        cache.remove("A")
+        assert await cache.ids(db, ["A", "B", "C"]) == {"B": 2, "C": 3}
+
+        cache.invalidate()
+        assert await cache.ids(db, ["A", "C"]) == {"A": 1, "C": 3}
+
+    anyio.run(_with_session, body)
+
+
+def test_writes_through_another_cache_make_it_reload():
+    async def body(db):
+        first, second = MemberCache(), MemberCache()
+        await first.members(db)
+        second.put("D", MemberInfo(9, "M", False))
+        # first missed the write, so it reloads from the database
+        assert "D" not in await first.members(db)
+        assert set(await first.members(db)) == {"A", "B"}
+
+    anyio.run(_with_session, body)
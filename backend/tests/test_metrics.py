@@ -0,0 +1,54 @@
+import pytest
+from fastapi import FastAPI
+
+from ..app.services import metrics
+
+TestClient = pytest.importorskip("fastapi.testclient").TestClient
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    metrics.reset()
+    with metrics.stage("solve"):
+        pass
+    metrics.inc("shift_generations_total", engine="ilp")
+    assert metrics.render() == ""
+
+
+def test_render_prometheus_text(enabled):
+    with metrics.stage("solve"):
+        pass
+    metrics.inc("shift_solver_runs_total", backend="cbc", status="optimal")
+    metrics.set_gauge("shift_model_variables", 152)
+    text = metrics.render()
+    assert "# TYPE shift_stage_seconds summary" in text
+    assert 'shift_stage_seconds_count{stage="solve"} 1' in text
+    assert 'shift_solver_runs_total{backend="cbc",status="optimal"} 1' in text
+    assert "shift_model_variables 152" in text
+
+
+def test_server_timing_header_sums_request_stages(enabled):
+    app = FastAPI()
+    app.add_middleware(metrics.ServerTimingMiddleware)
+
+    @app.get("/work")
+    def work():
+        for _ in range(2):
+            with metrics.stage("insert"):
+                pass
+        return {}
+
+    response = TestClient(app).get("/work")
+    header = response.headers["server-timing"]
+    assert header.startswith("insert;dur=")
+    assert header.count("insert") == 1
+    assert "total;dur=" in header
+    assert 'shift_http_request_seconds_count{method="GET",route="/work"} 1' in metrics.render()
@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+
+from ..app.services import presolve
+from ..app.services.scheduler import Member
+
+DAYS = [date(2025, 4, 1) + timedelta(days=k) for k in range(3)]
+
+
+def _member(i, days, gender="F", committee=False):
+    return Member(id=i, name=f"m{i}", gender=gender, is_committee=committee, preferred_days=set(days))
+
+
+def test_reduce_days_only_forces_days_without_shared_members():
+    # Days 1 and 2 have exactly four members each but share them, so both
+    # stay in the model. Day 3's two members work no other day and are
+    # assigned directly, though the day stays short.
+    members = [_member(i, DAYS[:2]) for i in range(4)] + [_member(i, [DAYS[2]]) for i in range(4, 6)]
+    reduced = presolve.reduce_days(members, DAYS, fixed={})
+    assert reduced.forced == {DAYS[2]: [4, 5]}
+    assert reduced.days == DAYS[:2]
+    assert reduced.unstaffable == [DAYS[2]]
+
+
+def test_member_classes_group_interchangeable_members():
+    members = [_member(i, DAYS) for i in range(3)] + [_member(3, DAYS, committee=True)]
+    members.append(_member(4, DAYS[:2]))
+    reduced = presolve.Presolved(
+        days=DAYS, available={d: {i for i, m in enumerate(members) if d in m.preferred_days} for d in DAYS}
+    )
+    classes = presolve.member_classes(members, reduced, base_load=[0] * 5, weights=[1.0] * 5)
+    assert sorted(c.positions for c in classes) == [[0, 1, 2], [3], [4]]
+
+
+def test_expand_skips_members_who_worked_the_day_before():
+    member_class = presolve.MemberClass(positions=[0, 1, 2], days=DAYS, gender="F", is_committee=False)
+    counts = {(0, DAYS[0]): 2, (0, DAYS[1]): 1, (0, DAYS[2]): 2}
+    working = {}
+    load = [0, 0, 0]
+    presolve.expand([member_class], counts, DAYS, working, load)
+    for d1, d2 in zip(DAYS[:-1], DAYS[1:]):
+        assert not working[d1] & working[d2]
+    assert sorted(load) == [1, 2, 2]
@@ -0,0 +1,39 @@
+import json
+from datetime import date
+from types import SimpleNamespace
+
+from ..app.routers.shift_generation import _compact_body, _ndjson_chunks
+
+MEMBERS = [SimpleNamespace(id=7, name="A"), SimpleNamespace(id=9, name="B")]
+DATES = [date(2025, 4, 10), date(2025, 4, 14)]
+DAILY = {DATES[0]: ["A", "B"], DATES[1]: ["B"]}
+SCHEDULE = {
+    "dates": {"2025-04-10": ["A", "B"], "2025-04-14": ["B"]},
+    "assign_count": {"A": 1, "B": 2},
+    "committee_count": 1,
+    "gender_count": {"male": 1, "female": 1},
+    "unapplied_rules": ["staff_count_day_2025-04-14"],
+    "diagnosis": {},
+    "id": 3,
+}
+
+
+def test_compact_body_uses_member_ids_and_day_offsets():
+    body = _compact_body("ok", MEMBERS, DATES, DAILY, SCHEDULE)
+    assert body["start"] == "2025-04-10"
+    assert body["members"] == [[7, "A"], [9, "B"]]
+    assert body["assign_count"] == [1, 2]
+    assert body["offsets"] == [0, 4]
+    assert body["assignments"] == [[7, 9], [9]]
+    assert body["unapplied_rules"] == ["staff_count_day_2025-04-14"]
+
+
+def test_ndjson_chunks_have_one_line_per_date():
+    lines = [json.loads(line) for line in b"".join(_ndjson_chunks("ok", DAILY, SCHEDULE)).splitlines()]
+    assert lines[0] == {"message": "ok", "id": 3}
+    assert lines[1:3] == [
+        {"date": "2025-04-10", "members": ["A", "B"]},
+        {"date": "2025-04-14", "members": ["B"]},
+    ]
+    assert lines[3]["assign_count"] == {"A": 1, "B": 2}
+    assert "dates" not in lines[3]
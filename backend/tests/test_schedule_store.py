@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+from ..app.services import schedule_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(schedule_store, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(schedule_store, "LATEST_FILE", tmp_path / "latest_schedule.json")
+    monkeypatch.setattr(schedule_store, "HISTORY_DIR", tmp_path / "schedules")
+    monkeypatch.setattr(schedule_store, "HISTORY_LIMIT", 2)
+    return schedule_store
+
+
+def test_save_keeps_bounded_history(store):
+    ids = [store.save_schedule({"dates": {"2025-04-10": [str(i)]}}) for i in range(3)]
+    assert ids == [1, 2, 3]
+    assert store.list_schedule_ids() == [3, 2]
+    assert store.load_schedule_bytes(1) is None
+    assert json.loads(store.load_schedule_bytes(2))["dates"] == {"2025-04-10": ["1"]}
+    assert store.load_latest_schedule()["id"] == 3
+    assert not list(store.DATA_DIR.glob("**/.tmp-*"))
+
+
+def test_latest_payload_is_cached_until_save(store):
+    assert store.latest_schedule_payload()[0] == b"{}"
+    store.save_schedule({"dates": {}})
+    body, etag = store.latest_schedule_payload()
+    assert json.loads(body) == {"dates": {}, "id": 1}
+    assert store.latest_schedule_payload() == (body, etag)
+    store.save_schedule({"dates": {}})
+    assert store.latest_schedule_payload()[1] != etag
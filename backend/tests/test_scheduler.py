@@ -0,0 +1,110 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from ..app.services import scheduler
+from ..app.services.availability_index import AvailabilityIndex
+from ..app.services.scheduler import Member
+from .conftest import make_members
+
+pytest.importorskip("pulp")
+
+
+def test_solve_schedule_respects_constraints():
+    days = [date(2025, 4, 1) + timedelta(days=k) for k in range(6)]
+    members = make_members(days)
+    result = scheduler.solve_schedule(members, days)
+    assert result["violated_constraints"] == []
+    by_id = {m.id: m for m in members}
+    for d in days:
+        staff = [by_id[i] for i in result["assignments"][d]]
+        assert len(staff) == 4
+        assert any(m.is_committee for m in staff)
+        assert {m.gender for m in staff} == {"M", "F"}
+    for d1, d2 in zip(days[:-1], days[1:]):
+        assert not set(result["assignments"][d1]) & set(result["assignments"][d2])
+
+
+def test_solve_schedule_never_assigns_unavailable_pairs():
+    days = [date(2025, 4, 1), date(2025, 4, 3)]
+    members = make_members(days)
+    members[0].preferred_days = {days[1]}
+    result = scheduler.solve_schedule(members, days)
+    assert 0 not in result["assignments"][days[0]]
+
+
+def test_solve_schedule_reports_unstaffable_day():
+    days = [date(2025, 4, 1)]
+    members = [m for m in make_members(days) if not m.is_committee]
+    result = scheduler.solve_schedule(members, days)
+    assert "committee_day_2025-04-01" in result["violated_constraints"]
+
+
+def test_plan_incremental_resolves_changed_days_and_neighbours():
+    days = [date(2025, 4, 1) + timedelta(days=k) for k in range(5)]
+    members = make_members(days)
+    members[0].preferred_days.discard(days[2])
+    index = AvailabilityIndex.from_members(members, days)
+    previous = {d: [0, 1, 2, 3] if d == days[2] else [4, 5, 6, 7] for d in days}
+    fixed, warm_start = scheduler.plan_incremental(previous, index, days)
+    assert set(fixed) == {days[0], days[4]}
+    assert warm_start[days[2]] == [0, 1, 2, 3]
+
+
+def test_solve_schedule_keeps_fixed_days_and_blocks_neighbours():
+    days = [date(2025, 4, 1) + timedelta(days=k) for k in range(3)]
+    members = make_members(days)
+    fixed = {days[0]: [0, 1, 2, 3]}
+    result = scheduler.solve_schedule(members, days, fixed=fixed, warm_start={days[1]: [4, 5, 6, 7]})
+    assert result["assignments"][days[0]] == [0, 1, 2, 3]
+    assert not set(result["assignments"][days[1]]) & {0, 1, 2, 3}
+    assert result["violated_constraints"] == []
+
+
+def test_split_into_months():
+    days = [date(2025, 4, 29), date(2025, 4, 30), date(2025, 5, 1), date(2025, 6, 2)]
+    assert scheduler.split_into_months(days) == [days[:2], [days[2]], [days[3]]]
+
+
+def test_solve_schedule_range_respects_month_boundaries():
+    days = [date(2025, 4, 28) + timedelta(days=k) for k in range(8)]
+    members = make_members(days)
+    result = scheduler.solve_schedule_range(members, days, max_workers=1)
+    assert result["violated_constraints"] == []
+    assert not set(result["assignments"][date(2025, 4, 30)]) & set(
+        result["assignments"][date(2025, 5, 1)]
+    )
+
+
+def test_target_loads_caps_members_at_their_availability():
+    capacity = np.array([1.0, 10.0, 10.0, 0.0])
+    weights = np.array([1.0, 1.0, 2.0, 1.0])
+    targets = scheduler.target_loads(capacity, weights, 10)
+    assert targets.tolist() == [1.0, 3.0, 6.0, 0.0]
+
+
+def _twelve_members(days):
+    # Four committee members, so no one is forced onto every other day
+    return make_members(days) + [
+        Member(id=8 + i, name=f"e{i}", gender="FM"[i % 2], is_committee=i < 2, preferred_days=set(days))
+        for i in range(4)
+    ]
+
+
+@pytest.mark.parametrize("fairness", scheduler.FAIRNESS_MODES)
+def test_solve_schedule_balances_loads(fairness):
+    days = [date(2025, 4, 1) + timedelta(days=k) for k in range(10)]
+    members = _twelve_members(days)
+    result = scheduler.solve_schedule(members, days, fairness=fairness)
+    loads = [sum(m.id in staff for staff in result["assignments"].values()) for m in members]
+    assert result["violated_constraints"] == []
+    assert max(loads) - min(loads) <= 1
+
+
+def test_solve_schedule_follows_weights():
+    days = [date(2025, 4, 1) + timedelta(days=k) for k in range(10)]
+    members = _twelve_members(days)
+    result = scheduler.solve_schedule(members, days, weights={1: 1.5, 3: 0.5})
+    loads = {m.id: sum(m.id in staff for staff in result["assignments"].values()) for m in members}
+    assert loads[1] > loads[5] > loads[3]
@@ -0,0 +1,72 @@
+import time
+from datetime import date, timedelta
+
+import pytest
+
+pulp = pytest.importorskip("pulp")
+
+from ..app.services import scheduler, solvers  # noqa: E402
+from ..app.services.solvers import SolverOptions  # noqa: E402
+from .conftest import make_members  # noqa: E402
+
+
+@pytest.mark.parametrize("backend", solvers.BACKENDS)
+def test_backends_solve_schedule(backend):
+    if backend not in solvers.available_backends():
+        pytest.skip(f"{backend} is not installed")
+    days = [date(2025, 4, 1) + timedelta(days=k) for k in range(4)]
+    options = SolverOptions(backend=backend, time_limit=10, gap_rel=0.0, threads=1)
+    result = scheduler.solve_schedule(make_members(days), days, options=options)
+    assert result["violated_constraints"] == []
+    assert result["solver"]["backend"] == backend
+    assert result["solver"]["status"] == solvers.OPTIMAL
+    assert result["solver"]["gap"] == 0.0
+
+
+def test_unmeetable_rules_are_relaxed_and_reported():
+    days = [date(2025, 4, 1), date(2025, 4, 2)]
+    # A single committee member cannot serve two consecutive days
+    members = make_members(days)[:5]
+    members[4].is_committee = False
+    result = scheduler.solve_schedule(members, days)
+    assert result["solver"]["status"] == solvers.OPTIMAL
+    assert len(result["violated_constraints"]) == 3
+    assert {rule.rsplit("_", 1)[0] for rule in result["violated_constraints"]} == {
+        "staff_count_day", "committee_day"
+    }
+    assert all(result["assignments"][d] for d in days)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        solvers.solve(None, SolverOptions(backend="glpk"))
+
+
+def test_relaxation_gap_uses_the_time_left_and_restores_incumbent():
+    problem = pulp.LpProblem("gap", pulp.LpMaximize)
+    x = pulp.LpVariable("x", 0, 3, cat="Integer")
+    y = pulp.LpVariable("y", 0, 3, cat="Integer")
+    problem += x + y
+    problem += 2 * x + 2 * y <= 5
+    problem.solve(pulp.PULP_CBC_CMD(msg=False))
+    incumbent = (x.varValue, y.varValue)
+
+    options = SolverOptions(time_limit=5, threads=1)
+    assert solvers._relaxation_gap(problem, options, time.perf_counter() - 6) is None
+    gap = solvers._relaxation_gap(problem, options, time.perf_counter())
+    assert gap == pytest.approx(0.25)
+    assert (x.varValue, y.varValue) == incumbent
+    assert problem.status == pulp.LpStatusOptimal
+
+
+def test_short_days_are_weighed_against_their_neighbours():
+    days = [date(2025, 4, 1) + timedelta(days=k) for k in range(3)]
+    # Day 2 has three members; 1 and 2 could also work days 1 and 3, which
+    # have enough members without them
+    members = make_members(days)
+    members[0].preferred_days = {days[1]}
+    for m in members[3:]:
+        m.preferred_days = {days[0], days[2]}
+    result = scheduler.solve_schedule(members, days)
+    assert sorted(result["assignments"][days[1]]) == [0, 1, 2]
+    assert result["violated_constraints"] == ["staff_count_day_2025-04-02"]
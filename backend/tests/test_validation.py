@@ -0,0 +1,49 @@
+from datetime import date
+
+from ..app.services.availability_index import AvailabilityIndex
+from ..app.services.scheduler import Member
+from ..app.services.validation import diagnose_days, validate_schedule
+
+
+def _members():
+    return [
+        Member(id=1, name="A", gender="M", is_committee=True),
+        Member(id=2, name="B", gender="F", is_committee=False),
+        Member(id=3, name="C", gender="M", is_committee=False),
+        Member(id=4, name="D", gender="F", is_committee=False),
+        Member(id=5, name="E", gender="M", is_committee=False),
+    ]
+
+
+def test_valid_schedule_has_no_violations():
+    days = [date(2025, 4, 10), date(2025, 4, 14)]
+    assignments = {days[0]: [1, 2, 3, 4], days[1]: [1, 2, 3, 4]}
+    assert validate_schedule(_members(), days, assignments) == []
+
+
+def test_violations_are_reported():
+    days = [date(2025, 4, 10), date(2025, 4, 11)]
+    assignments = {days[0]: [1, 2, 3, 4], days[1]: [2, 3, 5]}
+    violations = validate_schedule(_members(), days, assignments)
+    assert "staff_count_day_2025-04-11" in violations
+    assert "committee_day_2025-04-11" in violations
+    assert "no_consecutive_member_2_day_2025-04-10" in violations
+    assert "no_consecutive_member_3_day_2025-04-10" in violations
+    assert "male_day_2025-04-11" not in violations
+
+
+def test_diagnose_days_reports_supply_of_impossible_days():
+    days = [date(2025, 4, 10), date(2025, 4, 11)]
+    members = _members()
+    for m in members:
+        m.preferred_days = set(days) if m.id != 1 else {days[0]}
+    diagnosis = diagnose_days(AvailabilityIndex.from_members(members, days), members)
+    assert diagnosis == {
+        "2025-04-11": {
+            "available": 4,
+            "committee": 0,
+            "male": 2,
+            "female": 2,
+            "rules": ["committee_day_2025-04-11"],
+        }
+    }